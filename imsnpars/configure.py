@@ -33,23 +33,28 @@ def create_parser(model_path):
 normalizer = IMSNormalizer(normalizeNumbers=True, lowercase=True)
 
 
-def parse(parser, sentence):
-    parser._NDependencyParser__renewNetwork()
-    parse_tree = parser._NDependencyParser__predict_tree(
-        parser._NDependencyParser__reprBuilder.buildInstance(
-            [IMSConllToken(
-                tokId=(i + 1),
-                orth=token['form'],
-                lemma=token['lemma'],
-                pos=token['xpos'],
-                langPos=token['xpos'],
-                morph='',
-                headId=None,
-                dep=None,
-                norm=normalizer
-            ) for i, token in enumerate(sentence)]
-        )
+def parse(parser, sentence, max_length=0):
+    """Parses a conllu sentence in place.
+
+    Sentences longer than `max_length` tokens (if > 0) are parsed in windows;
+    the number of windows is then stored in the `imsnpars_windows` metadata.
+    """
+    parse_tree, windows = parser.parseSentence(
+        [IMSConllToken(
+            tokId=(i + 1),
+            orth=token['form'],
+            lemma=token['lemma'],
+            pos=token['xpos'],
+            langPos=token['xpos'],
+            morph='',
+            headId=None,
+            dep=None,
+            norm=normalizer
+        ) for i, token in enumerate(sentence)],
+        max_length
     )
+    if windows > 1:
+        sentence.metadata['imsnpars_windows'] = str(windows)
     for pos, token in enumerate(sentence):
         token.update(
             head=parse_tree.getHead(pos) + 1,
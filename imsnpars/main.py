@@ -40,6 +40,15 @@ def buildParserFromArgs():
     trainingArgs.add_argument("--patience", help="patience for the early update", type=int, required=False)
     trainingArgs.add_argument("--seed", help="random seed (different than dynet-seed)", type=int, required=False, default=42)
     trainingArgs.add_argument("--epochs", help="nr of epochs", type=int, required=False, default=30)
+    trainingArgs.add_argument("--trainPredictEvery", help="decode the training trees (only for the train accuracy) for every n-th sentence, 0 turns it off", type=int, required=False, default=1)
+    
+    # prediction
+    predictArgs = argParser.add_argument_group('prediction')
+    predictArgs.add_argument("--maxLength", help="parse sentences longer than that in windows of that many tokens (the roots of the windows are attached to the root of the first one), 0 turns it off", type=int, required=False, default=0)
+    predictArgs.add_argument("--decodeWorkers", help="decode trees (graph parser) in that many workers while the next sentences are scored, 0 decodes sequentially", type=int, required=False, default=0)
+    predictArgs.add_argument("--decodePool", help="type of the decoding workers", choices=[ "thread", "process" ], required=False, default="thread")
+    predictArgs.add_argument("--decodeWindow", help="nr of sentences scored in one computation graph when decoding in workers", type=int, required=False, default=32)
+    predictArgs.add_argument("--predictBatch", help="parse that many sentences together (transition parser), every parser step scores all of them at once, 0 parses one by one", type=int, required=False, default=0)
     
     # dynet
     dynetArgs = argParser.add_argument_group('dynet')
@@ -70,8 +79,9 @@ def buildParserFromArgs():
     options.fillParserOptions(args, opts)
     
     if args.model != None:
-        # all the args fields will get overwritten
+        # all the args fields will get overwritten (except the prediction ones)
         opts.load(args.model + ".args")
+        options.fillPredictionOptions(args, opts)
     
     opts.logOptions()
     parser = builder.buildParser(opts)
@@ -121,7 +131,7 @@ def main():
         else:
             trainer = training.AllEpochsTrainingManager(args.epochs, lambda: parser.save(args.save))
 
-        parser.train(trainData, trainer, devData)
+        parser.train(trainData, trainer, devData, predictEvery=args.trainPredictEvery)
 
         # because of early update we need to load the best model
         if args.patience and args.test != None and args.save != None:
@@ -134,12 +144,14 @@ def main():
         sys.exit()
 
     if args.test != None:
+        decodeArgs = { "decodeWorkers" : args.decodeWorkers, "decodePool" : args.decodePool, "decodeWindow" : args.decodeWindow, "maxLength" : args.maxLength,
+                       "predictBatch" : args.predictBatch }
         if args.output == None:
             lazyEval = evaluator.LazyTreeEvaluator()
-            parser.predict(testData, lazyEval)
+            parser.predict(testData, lazyEval, **decodeArgs)
             logging.info("Test acc: %f %f" % (lazyEval.calcUAS(), lazyEval.calcLAS()))
         else:
-            parser.predict(testData, utils.LazySentenceWriter(open(args.output, "w")))
+            parser.predict(testData, utils.LazySentenceWriter(open(args.output, "w")), **decodeArgs)
 
 
 if __name__ == '__main__':
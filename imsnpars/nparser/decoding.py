@@ -0,0 +1,51 @@
+'''
+Created on 18.10.2026
+
+@author: falensaa
+'''
+
+import logging
+import sys
+
+from concurrent import futures
+
+from imsnpars.nparser.graph.mst import gdatatypes
+
+# the decoder of a worker process (set once by the initializer)
+_workerMST = None
+
+def _initWorker(mstAlg):
+    global _workerMST
+    _workerMST = mstAlg
+
+def _decodeInWorker(scores, candidates):
+    return _workerMST.findMSTHeads(gdatatypes.SquareArrayScores(len(scores), scores, candidates))
+
+class DecodingPool(object):
+    """Finds the heads of score matrices in worker threads or processes.
+
+    Only the numpy score matrices (with the candidate masks of pruned
+    sentences) are sent to the workers, so the main thread can keep scoring
+    (and labeling) with dynet in the meantime. Heads are returned as
+    futures, the caller keeps the order."""
+
+    def __init__(self, mstAlg, workers, poolType):
+        self.__logger = logging.getLogger(self.__class__.__name__)
+
+        if poolType == "thread":
+            self.__executor = futures.ThreadPoolExecutor(workers)
+            self.__decode = lambda scores, candidates : mstAlg.findMSTHeads(gdatatypes.SquareArrayScores(len(scores), scores, candidates))
+        elif poolType == "process":
+            self.__executor = futures.ProcessPoolExecutor(workers, initializer=_initWorker, initargs=(mstAlg,))
+            self.__decode = _decodeInWorker
+        else:
+            self.__logger.error("Unknown decoding pool: %s" % poolType)
+            sys.exit()
+
+        self.__logger.info("Decoding with %i %s workers" % (workers, poolType))
+
+    def submit(self, scores, candidates = None):
+        return self.__executor.submit(self.__decode, scores, candidates)
+
+    def shutdown(self):
+        self.__executor.shutdown()
@@ -6,6 +6,7 @@ Created on Jun 29, 2018
 
 import dynet
 import logging
+import numpy as np
 
 class FeatOutputCache(object):
     def __init__(self):
@@ -38,6 +39,10 @@ class FeatReprBuilder(object):
         featIds = self.__featExtractor.getFeatIds() + [ feat.getFeatId() for feat in featBuilders.values() ]
         self.__dummyVecBuilder.setFeatIds(featIds)
         self.__nrOfFeatures = len(featIds)
+        
+        # projected representations of the built features, valid for one computation graph
+        self.__allFeatReprs = { }
+        self.__featReprs = { }
     
     def getNrOfFeatures(self):
         return self.__nrOfFeatures
@@ -47,6 +52,10 @@ class FeatReprBuilder(object):
             feat.initializeParameters(model, inputDim)
 
         self.__dummyVecBuilder.initializeParameters(model)
+        
+    def renewNetwork(self):
+        self.__allFeatReprs = { }
+        self.__featReprs = { }
 
     def __getVectorForId(self, featId, wId, vectors):
         if self.__reprLayer == None:
@@ -71,9 +80,87 @@ class FeatReprBuilder(object):
         if featId not in self.__featBuilders:
             return None
         
-        featVec = self.__featBuilders[featId].buildRepresentation(feat, isTraining)
-        featRepr = self.__network.buildFeatOutput(featId, featVec, isTraining)
-        return featRepr
+        key = (featId, self.__featBuilders[featId].getIndex(feat))
+        if key not in self.__featReprs:
+            self.__featReprs[key] = dynet.pick(self.__getAllFeatReprs(featId, isTraining), key[1], 1)
+        
+        return self.__featReprs[key]
+    
+    def onlyBuildFeatReprMatrix(self, featId, feats, isTraining):
+        if featId not in self.__featBuilders:
+            return None
+        
+        featIndices = [ self.__featBuilders[featId].getIndex(feat) for feat in feats ]
+        return dynet.select_cols(self.__getAllFeatReprs(featId, isTraining), featIndices)
+    
+    def onlyBuildArcFeatReprMatrix(self, featId, length, isTraining):
+        """Builds representations of all the arcs of a sentence (with the root), one column per arc in the dependent-major order"""
+        if featId not in self.__featBuilders:
+            return None
+        
+        return dynet.select_cols(self.__getAllFeatReprs(featId, isTraining), self.__featBuilders[featId].getArcIndices(length))
+    
+    def onlyBuildArcFeatReprValues(self, featId, length, isTraining):
+        """Same as onlyBuildArcFeatReprMatrix, but returns a numpy matrix (nothing is added to the computation graph per arc)"""
+        if featId not in self.__featBuilders:
+            return None
+        
+        return self.__getAllFeatReprs(featId, isTraining).npvalue()[:, self.__featBuilders[featId].getArcIndices(length)]
+    
+    def __getAllFeatReprs(self, featId, isTraining):
+        # all the values of a feature are projected only once per computation graph
+        if featId not in self.__allFeatReprs:
+            allVecs = self.__featBuilders[featId].buildAllRepresentations(isTraining)
+            self.__allFeatReprs[featId] = self.__network.buildFeatOutput(featId, allVecs, isTraining)
+            
+        return self.__allFeatReprs[featId]
+    
+    def buildAllPositionsFeatRepr(self, vectors, isTraining):
+        """Projects the root, all the tokens and the dummy vector with the hidden layer of every feature (once per sentence).
+        
+        Returns a matrix with one column per feature and position, see getPositionColumns."""
+        tokVecs = dynet.concatenate_cols([ self.__getVectorForId(None, wId, vectors) for wId in range(-1, len(vectors.wordsV)) ])
+        
+        featMatrices = [ ]
+        for featId in self.__featExtractor.getFeatIds():
+            featVecs = dynet.concatenate_cols([ tokVecs, self.__getVectorForId(featId, None, vectors) ])
+            featMatrices.append(self.__network.buildFeatOutput(featId, featVecs, isTraining))
+            
+        return dynet.concatenate_cols(featMatrices)
+    
+    def extractAllPositions(self, data):
+        return self.__featExtractor.extractAllPositions(data)
+    
+    def getPositionColumns(self, positions, length):
+        """Maps the positions of all the features (from extractAllPositions) to the columns of buildAllPositionsFeatRepr.
+        
+        Every feature has length + 2 columns: root, tokens and the dummy
+        vector, which is used for the missing features (positions below -1)."""
+        offsets = np.arange(len(positions)) * (length + 2)
+        return np.where(positions < -1, length + 1, positions + 1) + offsets
+    
+    def extractAndBuildFeatReprMatrix(self, featId, feats, data, vectors, isTraining):
+        """Builds summed representations for many positions, one column per position"""
+        
+        columns = { }
+        dummies = { }
+        for feat in feats:
+            for (fId, fPos) in self.__featExtractor.extractFeatures(featId, data, feat):
+                if fPos == None:
+                    if fId not in dummies:
+                        dummies[fId] = self.__getVectorForId(fId, fPos, vectors)
+                    featVec = dummies[fId]
+                else:
+                    featVec = self.__getVectorForId(fId, fPos, vectors)
+                    
+                if fId not in columns:
+                    columns[fId] = [ ]
+                columns[fId].append(featVec)
+        
+        if len(columns) == 0:
+            return None
+        
+        return dynet.esum([ self.__network.buildFeatOutput(fId, dynet.concatenate_cols(featVecs), isTraining) for fId, featVecs in columns.items() ])
     
     def extractAndBuildFeatRepr(self, featId, feat, data, vectors, isTraining):
         feats = self.__featExtractor.extractFeatures(featId, data, feat)
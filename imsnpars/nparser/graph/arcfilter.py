@@ -0,0 +1,90 @@
+'''
+Created on 18.10.2026
+
+@author: falensaa
+'''
+
+import logging
+import pickle
+import numpy as np
+
+class POSArcFilter(object):
+    """Rules out the arcs which were never seen in the training trees.
+
+    An arc is described by the POS tags of its head and dependent, its
+    direction and a bucket of its length. The filter runs before any neural
+    scoring; arcs entering the root and arcs touching tokens with unknown
+    POS tags are always kept."""
+
+    # lower bounds of the distance buckets
+    DIST_BUCKETS = np.array([ 1, 2, 3, 4, 5, 7, 10, 15, 20, 30 ])
+
+    def __init__(self):
+        self.__logger = logging.getLogger(self.__class__.__name__)
+        self.__pos2Id = { }
+
+        # (head POS x dependent POS x head is left x distance bucket)
+        self.__seenArcs = np.zeros((0, 0, 2, len(self.DIST_BUCKETS)), dtype=bool)
+        self.__resetStats()
+
+    def readData(self, sentences):
+        for sent in sentences:
+            for tok in sent:
+                if tok.pos not in self.__pos2Id:
+                    self.__pos2Id[tok.pos] = len(self.__pos2Id)
+
+        nrOfPOS = len(self.__pos2Id)
+        self.__seenArcs = np.zeros((nrOfPOS, nrOfPOS, 2, len(self.DIST_BUCKETS)), dtype=bool)
+        for sent in sentences:
+            for dId, tok in enumerate(sent):
+                if tok.headId == None or tok.getHeadPos() == -1:
+                    continue
+
+                hId = tok.getHeadPos()
+                hPOS, dPOS = self.__pos2Id[sent[hId].pos], self.__pos2Id[tok.pos]
+                self.__seenArcs[hPOS, dPOS, int(hId < dId), self.__getBucket(abs(dId - hId))] = True
+
+        self.__logger.info("Seen arc types: %i" % np.count_nonzero(self.__seenArcs))
+
+    def save(self, pickleOut):
+        pickle.dump((self.__pos2Id, self.__seenArcs), pickleOut)
+
+    def load(self, pickleIn):
+        (self.__pos2Id, self.__seenArcs) = pickle.load(pickleIn)
+
+    def findAllowedArcs(self, instance):
+        """Returns a (head x dependent) mask of the arcs which may be scored, the root is at position 0"""
+        posIds = np.array([ self.__pos2Id.get(tok.pos, -1) for tok in instance.sentence ], dtype=np.int64)
+        positions = np.arange(len(posIds))
+
+        # (head x dependent)
+        dists = positions[None, :] - positions[:, None]
+        hPOS = np.broadcast_to(posIds[:, None], dists.shape)
+        dPOS = np.broadcast_to(posIds[None, :], dists.shape)
+
+        allowed = self.__seenArcs[np.maximum(hPOS, 0), np.maximum(dPOS, 0), (dists > 0).astype(np.int64), self.__getBucket(np.abs(dists))]
+        allowed |= (hPOS < 0) | (dPOS < 0)
+        np.fill_diagonal(allowed, False)
+
+        length = len(posIds) + 1
+        mask = np.zeros((length, length), dtype=bool)
+        mask[1:, 1:] = allowed
+        mask[0, 1:] = True
+
+        self.__keptArcs += np.count_nonzero(mask)
+        self.__allArcs += len(posIds) * len(posIds)
+        return mask
+
+    def logStats(self):
+        if self.__allArcs == 0:
+            return
+
+        self.__logger.info("Arc filter kept %.2f%% of the arcs" % (100.0 * self.__keptArcs / self.__allArcs))
+        self.__resetStats()
+
+    def __getBucket(self, dist):
+        return np.maximum(np.searchsorted(self.DIST_BUCKETS, dist, side="right") - 1, 0)
+
+    def __resetStats(self):
+        self.__keptArcs = 0
+        self.__allArcs = 0
@@ -10,22 +10,63 @@ import sys
 import imsnpars.nparser.features
 import imsnpars.nparser.network
 import imsnpars.nparser.graph.features as gfeatures
-from imsnpars.nparser.graph import task, decoder
-from imsnpars.nparser.graph.mst import cle
+from imsnpars.nparser.graph import task, decoder, pruning, arcfilter
+from imsnpars.nparser.graph.mst import cle, arraycle, eisner
 from imsnpars.nparser.labels import task as ltask
 
 def buildMSTDecoder(opts, featBuilder):
     if opts.mst == "CLE":
         mstAlg = cle.ChuLiuEdmonds()
-        decod = decoder.FirstOrderDecoder(featBuilder)
+    elif opts.mst == "NCLE":
+        mstAlg = arraycle.ArrayChuLiuEdmonds()
+    elif opts.mst == "EISNER":
+        mstAlg = eisner.Eisner()
     else:
         logging.error("Unknown algorithm: %s" % opts.mst)
         sys.exit()
     
+    if opts.scorer == "pairwise":
+        decod = decoder.FirstOrderDecoder(featBuilder)
+    elif opts.scorer == "batched":
+        decod = decoder.BatchedFirstOrderDecoder(featBuilder)
+    elif opts.scorer == "lazy":
+        decod = decoder.LazyFirstOrderDecoder(featBuilder)
+    else:
+        logging.error("Unknown scorer: %s" % opts.scorer)
+        sys.exit()
+    
     logging.info("Graph system used: %s" % type(mstAlg))
     logging.info("Decoder used: %s" % type(decod))
     return mstAlg, decod
 
+def buildArcPruner(opts):
+    if opts.pruneK <= 0:
+        if opts.predictPruneK:
+            logging.warning("The model has no pruning scorer (trained without --pruneK), --predictPruneK is ignored")
+        return None
+    
+    # the scorer is a part of the model, only k may change at prediction
+    k = opts.pruneK if opts.predictPruneK == None else opts.predictPruneK
+    logging.info("Arc pruning: k=%i, min length=%i, rank=%i" % (k, opts.pruneMinLength, opts.pruneRank))
+    return pruning.ArcPruner(k, opts.pruneMinLength, opts.pruneRank, opts.parseLayer)
+
+def buildPruningReport(opts, pruner):
+    if not opts.pruneReport:
+        return None
+    
+    if pruner == None:
+        logging.warning("Nothing is pruned, --pruneReport is ignored")
+        return None
+    
+    return pruning.PruningReport()
+
+def buildArcFilter(opts):
+    if not opts.arcFilter:
+        return None
+    
+    logging.info("Using POS arc filter")
+    return arcfilter.POSArcFilter()
+
 def buildGraphFeatureExtractors(featuresD, reprDim):
     featIds = { ("h", "0"): gfeatures.FeatId.HEAD,
                 ("d", "0"): gfeatures.FeatId.DEP,
@@ -81,11 +122,15 @@ def buildGraphParser(opts, dummyBuilder, reprBuilder):
     network = imsnpars.nparser.network.ParserNetwork(opts.mlpHiddenDim, opts.nonLinFun, featIds)
     featBuilder = imsnpars.nparser.features.FeatReprBuilder(extractor, featBuilders, dummyBuilder, network, opts.parseLayer)
     mstAlg, decod = buildMSTDecoder(opts, featBuilder)
+    pruner = buildArcPruner(opts)
+    pruneReport = buildPruningReport(opts, pruner)
+    arcFilter = buildArcFilter(opts)
     
     if opts.labeler == "graph":
         lblDict = ltask.LblTagDict()
-        parsingTask = task.NNGraphParsingTaskWithLbl(mstAlg, featBuilder, decod, network, opts.augment, lblDict)
+        parsingTask = task.NNGraphParsingTaskWithLbl(mstAlg, featBuilder, decod, network, opts.augment, lblDict, pruner, arcFilter,
+                                                     factorizedLbls = opts.lblScoring == "factorized", pruneReport = pruneReport)
     else:
-        parsingTask = task.NNGraphParsingTask(mstAlg, featBuilder, decod, network, opts.augment)
+        parsingTask = task.NNGraphParsingTask(mstAlg, featBuilder, decod, network, opts.augment, pruner, arcFilter, pruneReport)
     
     return parsingTask
@@ -6,6 +6,7 @@ Created on 23.08.2017
 
 import abc
 import dynet
+import numpy as np
 
 from imsnpars.nparser.graph import features as gfeatures
 
@@ -23,18 +24,21 @@ class GraphDecoder(object):
     @abc.abstractmethod
     def augmentScores(self, scores, instance, cost = 1.0):
         pass
+    
+    @abc.abstractmethod
+    def calculateLblScores(self, instance, vectors, network, arcs, isTraining):
+        pass
 
 class FirstOrderDecoder(GraphDecoder):
     def __init__(self, featReprBuilder):
         self.__featReprBuilder = featReprBuilder
         
     def findErrors(self, outputs, correct, predicted):
-        errs = [ tPos for tPos in range(correct.nrOfTokens()) if correct.getHead(tPos) != predicted.getHead(tPos) ]
-           
-        if len(errs) == 0:
-            return [ ]
+        correctHeads = correct.toList()
+        predictedHeads = predicted.toList()
+        errs = np.flatnonzero(np.not_equal(correctHeads, predictedHeads)).tolist()
            
-        return [ (outputs.getOutput(predicted.getHead(tPos), tPos), outputs.getOutput(correct.getHead(tPos), tPos)) for tPos in errs ]
+        return [ (outputs.getOutput(predictedHeads[tPos], tPos), outputs.getOutput(correctHeads[tPos], tPos)) for tPos in errs ]
 
     #@profile
     def calculateScores(self, instance, vectors, network, scores, isTraining):
@@ -44,11 +48,16 @@ class FirstOrderDecoder(GraphDecoder):
             depRepr = dynet.esum(depReprs) if len(depReprs) > 0 else None
             dReprCache[dId] = (depRepr, len(depReprs))
         
+        candidates = scores.candidates
+        netOuts = [ ]
         for hId in range(-1, len(instance.sentence)):
             headReprs = self.__featReprBuilder.extractAndBuildFeatRepr(gfeatures.FeatId.HEAD, hId, instance.sentence, vectors, isTraining)
             headRepr = dynet.esum(headReprs) if len(headReprs) > 0 else None
             
             for dId in range(-1, len(instance.sentence)):
+                if candidates is not None and not candidates[hId + 1, dId + 1]:
+                    continue
+                
                 depRepr, depNr = dReprCache[dId]
                 distRepr = self.__featReprBuilder.onlyBuildFeatRepr(gfeatures.FeatId.DIST, (hId, dId), isTraining)
                 
@@ -62,13 +71,198 @@ class FirstOrderDecoder(GraphDecoder):
                 featRepr = dynet.esum([ f for f in featRepr if f is not None])
                 netOut = network.buildOutput(featRepr, isTraining=isTraining)
                 
-                scores.addOutput(hId, dId, netOut)
-                scores.addScore(hId, dId, dynet.max_dim(netOut).scalar_value())
+                netOuts.append(netOut)
+        
+        length = len(instance.sentence) + 1
+        scores.setOutputTable(ArcOutputList(netOuts, arcColumns(length, candidates, "C")))
+        
+        # all the scores (maxima over the outputs) computed in one forward pass, head-major
+        arcScores = dynet.max_dim(dynet.concatenate_cols(netOuts), 0).npvalue()
+        if candidates is None:
+            scores.setScores(np.reshape(arcScores, (length, length)))
+        else:
+            scores.setCandidateScores(np.reshape(arcScores, (-1,)))
     
     def augmentScores(self, scores, instance, cost = 1.0):
-        for hId in range(-1, len(instance.sentence)):
-            for dId in range(0, len(instance.sentence)):
-                if hId != instance.sentence[dId].getHeadPos():
-                    oldScore = scores.getScore(hId, dId)
-                    scores.addScore(hId, dId, oldScore + cost)
-   
\ No newline at end of file
+        # every arc except the correct ones (and the ones entering the root) costs 'cost'
+        correctHeads = np.asarray(instance.correctTree.toList(), dtype=np.int64)
+        scores.scores[:, 1:] += cost
+        scores.scores[correctHeads + 1, np.arange(1, len(correctHeads) + 1)] -= cost
+        
+    def calculateLblScores(self, instance, vectors, network, arcs, isTraining):
+        """Label scores (the secondary output of the network) of the given (head, dependent) arcs, one column per arc"""
+        heads = [ hId for (hId, _) in arcs ]
+        deps = [ dId for (_, dId) in arcs ]
+        
+        featRepr = [ self.__featReprBuilder.extractAndBuildFeatReprMatrix(gfeatures.FeatId.HEAD, heads, instance.sentence, vectors, isTraining),
+                     self.__featReprBuilder.extractAndBuildFeatReprMatrix(gfeatures.FeatId.DEP, deps, instance.sentence, vectors, isTraining),
+                     self.__featReprBuilder.onlyBuildFeatReprMatrix(gfeatures.FeatId.DIST, arcs, isTraining) ]
+        
+        featRepr = dynet.esum([ f for f in featRepr if f is not None ])
+        return network.buildSecondaryOutputs(featRepr, isTraining=isTraining)
+
+def arcColumns(length, candidates, order):
+    """Position of every arc among the scored arcs (-1 for arcs which were not scored)"""
+    if candidates is None:
+        return np.arange(length * length).reshape((length, length), order=order)
+    
+    columns = np.full((length, length), -1, dtype=np.int64)
+    if order == "C":
+        columns[candidates] = np.arange(np.count_nonzero(candidates))
+    else:
+        columns.T[candidates.T] = np.arange(np.count_nonzero(candidates))
+    return columns
+
+def arcColumn(columns, hId, dId):
+    """Position of the (head, dependent) arc among the scored arcs, fails for arcs which were not scored"""
+    column = int(columns[hId + 1, dId + 1])
+    if column < 0:
+        raise RuntimeError("Arc %i -> %i was not scored (not a candidate arc)" % (hId, dId))
+    return column
+
+class ArcOutputList(object):
+    """Outputs of the scored arcs as a list of expressions"""
+    
+    def __init__(self, outputs, columns):
+        self.__outputs = outputs
+        self.__columns = columns
+        
+    def getOutput(self, hId, dId):
+        return self.__outputs[arcColumn(self.__columns, hId, dId)]
+    
+    def getOutputValues(self, arcs):
+        values = dynet.concatenate_cols([ self.getOutput(hId, dId) for (hId, dId) in arcs ]).npvalue()
+        return np.reshape(values, (-1, len(arcs)), order="F")
+    
+class ArcOutputMatrix(object):
+    """Outputs of the scored arcs kept as one matrix, outputs of single arcs are picked on demand"""
+    
+    def __init__(self, outputs, columns):
+        self.__outputs = outputs
+        self.__columns = columns
+        
+    def getOutput(self, hId, dId):
+        return dynet.pick(self.__outputs, arcColumn(self.__columns, hId, dId), 1)
+    
+    def getOutputValues(self, arcs):
+        columns = [ arcColumn(self.__columns, hId, dId) for (hId, dId) in arcs ]
+        values = dynet.select_cols(self.__outputs, columns).npvalue()
+        return np.reshape(values, (-1, len(arcs)), order="F")
+        
+class BatchedFirstOrderDecoder(FirstOrderDecoder):
+    """Scores all the arcs with a few matrix operations instead of one MLP application per arc"""
+    
+    def __init__(self, featReprBuilder):
+        super().__init__(featReprBuilder)
+        self.__featReprBuilder = featReprBuilder
+        
+    def calculateScores(self, instance, vectors, network, scores, isTraining):
+        positions = list(range(-1, len(instance.sentence)))
+        length = len(positions)
+        
+        headRepr = self.__featReprBuilder.extractAndBuildFeatReprMatrix(gfeatures.FeatId.HEAD, positions, instance.sentence, vectors, isTraining)
+        depRepr = self.__featReprBuilder.extractAndBuildFeatReprMatrix(gfeatures.FeatId.DEP, positions, instance.sentence, vectors, isTraining)
+        assert headRepr is not None or depRepr is not None
+        
+        hidDim = (headRepr if headRepr is not None else depRepr).dim()[0][0]
+        
+        # (hidden, head, dep) -- the columns of the flattened tensor are dep-major
+        headRepr = dynet.reshape(headRepr, (hidDim, length, 1)) if headRepr is not None else dynet.zeros((hidDim, length, 1))
+        depRepr = dynet.reshape(depRepr, (hidDim, 1, length)) if depRepr is not None else dynet.zeros((hidDim, 1, length))
+        featRepr = headRepr + depRepr
+        
+        distRepr = self.__featReprBuilder.onlyBuildArcFeatReprMatrix(gfeatures.FeatId.DIST, length, isTraining)
+        if distRepr is not None:
+            featRepr = featRepr + dynet.reshape(distRepr, (hidDim, length, length))
+        
+        featRepr = dynet.reshape(featRepr, (hidDim, length * length))
+        candidates = scores.candidates
+        if candidates is not None:
+            featRepr = dynet.select_cols(featRepr, np.flatnonzero(np.ravel(candidates, order="F")).tolist())
+        
+        netOut = network.buildOutputs(featRepr, isTraining=isTraining)
+        scores.setOutputTable(ArcOutputMatrix(netOut, arcColumns(length, candidates, "F")))
+        
+        arcScores = dynet.max_dim(netOut, 0).npvalue()
+        if candidates is None:
+            scores.setScores(np.reshape(arcScores, (length, length), order="F"))
+        else:
+            scores.setCandidateScores(np.reshape(arcScores, (-1,)), order="F")
+
+class LazyFirstOrderDecoder(FirstOrderDecoder):
+    """Computes the scores of all the arcs forward-only (in numpy).
+    
+    Expressions are built only for the arcs which are asked for (the errors
+    in the losses and the arcs of the predicted tree for labeling)."""
+    
+    def __init__(self, featReprBuilder):
+        super().__init__(featReprBuilder)
+        self.__featReprBuilder = featReprBuilder
+        
+    def calculateScores(self, instance, vectors, network, scores, isTraining):
+        positions = list(range(-1, len(instance.sentence)))
+        length = len(positions)
+        
+        headRepr = self.__featReprBuilder.extractAndBuildFeatReprMatrix(gfeatures.FeatId.HEAD, positions, instance.sentence, vectors, isTraining)
+        depRepr = self.__featReprBuilder.extractAndBuildFeatReprMatrix(gfeatures.FeatId.DEP, positions, instance.sentence, vectors, isTraining)
+        assert headRepr is not None or depRepr is not None
+        
+        # (hidden, head, dep)
+        featRepr = 0.0
+        if headRepr is not None:
+            featRepr = featRepr + headRepr.npvalue()[:, :, None]
+        if depRepr is not None:
+            featRepr = featRepr + depRepr.npvalue()[:, None, :]
+        
+        hidDim = featRepr.shape[0]
+        featRepr = np.reshape(np.broadcast_to(featRepr, (hidDim, length, length)), (hidDim, length * length), order="F")
+        
+        distRepr = self.__featReprBuilder.onlyBuildArcFeatReprValues(gfeatures.FeatId.DIST, length, isTraining)
+        if distRepr is not None:
+            featRepr = featRepr + distRepr
+        
+        candidates = scores.candidates
+        if candidates is not None:
+            featRepr = featRepr[:, np.flatnonzero(np.ravel(candidates, order="F"))]
+        
+        outputValues = network.evaluateOutputs(featRepr)
+        scores.setOutputTable(LazyArcOutputs(headRepr, depRepr, self.__featReprBuilder, network, isTraining, 
+                                             outputValues, arcColumns(length, candidates, "F")))
+        
+        arcScores = np.max(outputValues, axis=0)
+        if candidates is None:
+            scores.setScores(np.reshape(arcScores, (length, length), order="F"))
+        else:
+            scores.setCandidateScores(arcScores, order="F")
+
+class LazyArcOutputs(object):
+    """Builds the output expressions of single arcs on demand, the values of all the outputs are already known"""
+    
+    def __init__(self, headRepr, depRepr, featReprBuilder, network, isTraining, values, columns):
+        self.__headRepr = headRepr
+        self.__depRepr = depRepr
+        self.__featReprBuilder = featReprBuilder
+        self.__network = network
+        self.__isTraining = isTraining
+        self.__values = values
+        self.__columns = columns
+        self.__outputs = { }
+        
+    def getOutputValues(self, arcs):
+        return self.__values[:, [ arcColumn(self.__columns, hId, dId) for (hId, dId) in arcs ]]
+        
+    def getOutput(self, hId, dId):
+        if (hId, dId) not in self.__outputs:
+            featRepr = [ ]
+            if self.__headRepr is not None:
+                featRepr.append(dynet.pick(self.__headRepr, hId + 1, 1))
+            if self.__depRepr is not None:
+                featRepr.append(dynet.pick(self.__depRepr, dId + 1, 1))
+                
+            distRepr = self.__featReprBuilder.onlyBuildFeatRepr(gfeatures.FeatId.DIST, (hId, dId), self.__isTraining)
+            if distRepr is not None:
+                featRepr.append(distRepr)
+            
+            self.__outputs[(hId, dId)] = self.__network.buildOutput(dynet.esum(featRepr), isTraining=self.__isTraining)
+            
+        return self.__outputs[(hId, dId)]
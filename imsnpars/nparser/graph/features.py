@@ -4,6 +4,8 @@ Created on 23.08.2017
 @author: falensaa
 '''
 
+import dynet
+import numpy as np
 from enum import IntEnum
 
 class FeatId(IntEnum):
@@ -61,17 +63,36 @@ class DistFeatureBuilder(object):
         self.__featId = FeatId.DIST
         self.__maxDist = maxDist
         self.__lookup = None
+        
+        # sentence length -> columns of all the arcs
+        self.__arcIndices = { }
          
     def getFeatId(self):
         return self.__featId
     
     def buildRepresentation(self, feat, isTraining):
+        return self.__lookup[self.getIndex(feat)]
+    
+    def buildAllRepresentations(self, isTraining):
+        """Returns vectors of all the distances, one column per distance"""
+        return dynet.concatenate_cols([ self.__lookup[dist] for dist in range(self.__maxDist + 1) ])
+    
+    def getIndex(self, feat):
         hId, dId = feat
         dist = abs(hId - dId)
         if dist > self.__maxDist:
             dist = self.__maxDist
-             
-        return self.__lookup[dist]
+        
+        return dist
+    
+    def getArcIndices(self, length):
+        """Returns the columns of all the arcs (positions -1..length-2) in the dependent-major order"""
+        if length not in self.__arcIndices:
+            positions = np.arange(length)
+            dists = np.minimum(np.abs(positions[None, :] - positions[:, None]), self.__maxDist)
+            self.__arcIndices[length] = np.ravel(dists, order="F").tolist()
+            
+        return self.__arcIndices[length]
          
     def initializeParameters(self, model, inputDim):
         #TODO:  fill only part of the vector
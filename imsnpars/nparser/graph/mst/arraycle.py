@@ -0,0 +1,93 @@
+'''
+Created on 18.10.2026
+
+@author: falensaa
+'''
+
+import numpy as np
+
+from imsnpars.nparser.graph.mst import gdatatypes
+
+class ArrayChuLiuEdmonds(gdatatypes.MaximumSpanningTreeAlgorithm):
+    """Chu-Liu-Edmonds working directly on a (head x dependent) numpy score matrix.
+
+    Every contraction is a handful of vectorized operations over the current
+    score matrix, so no graph objects are built while decoding."""
+
+    def __init__(self):
+        super().__init__()
+
+    def handlesNonProjectiveTrees(self):
+        return True
+
+    def findMST(self, weights):
+        weights = np.array(weights, dtype=np.float64)
+
+        # no self-loops and no arcs entering the root
+        np.fill_diagonal(weights, -np.inf)
+        weights[:, 0] = -np.inf
+
+        heads = self.__runCLE(weights)
+        heads[0] = -1
+        return heads
+
+    def findMSTHeads(self, scores):
+        return self.findMST(scores.scores).tolist()
+
+    def __runCLE(self, weights):
+        heads = np.argmax(weights, axis=0)
+        cycle = self.__findCycle(heads)
+        if cycle is None:
+            return heads
+
+        inCycle = np.zeros(len(weights), dtype=bool)
+        inCycle[cycle] = True
+        rest = np.flatnonzero(~inCycle)
+        cycleNode = len(rest)
+
+        # arcs entering the cycle replace the arc of the cycle they break
+        cycleWeights = weights[heads[cycle], cycle]
+        enterWeights = weights[np.ix_(rest, cycle)] - cycleWeights
+        bestEnter = np.argmax(enterWeights, axis=1)
+
+        # arcs leaving the cycle come from its best node
+        leaveWeights = weights[np.ix_(cycle, rest)]
+        bestLeave = np.argmax(leaveWeights, axis=0)
+
+        contracted = np.empty((cycleNode + 1, cycleNode + 1))
+        contracted[:cycleNode, :cycleNode] = weights[np.ix_(rest, rest)]
+        contracted[:cycleNode, cycleNode] = enterWeights[np.arange(cycleNode), bestEnter]
+        contracted[cycleNode, :cycleNode] = leaveWeights[bestLeave, np.arange(cycleNode)]
+        contracted[cycleNode, cycleNode] = -np.inf
+
+        contractedHeads = self.__runCLE(contracted)
+
+        # resolve the cycle: the root (position 0) keeps its dummy head
+        restHeads = contractedHeads[1:cycleNode]
+        fromCycle = restHeads == cycleNode
+        heads[rest[1:]] = np.where(fromCycle, cycle[bestLeave[1:]], rest[np.minimum(restHeads, cycleNode - 1)])
+
+        headOfCycle = contractedHeads[cycleNode]
+        heads[cycle[bestEnter[headOfCycle]]] = rest[headOfCycle]
+        return heads
+
+    def __findCycle(self, heads):
+        # 0 -- not visited, 1 -- on the current path, 2 -- done
+        visited = [ 0 ] * len(heads)
+        visited[0] = 2
+
+        for start in range(1, len(heads)):
+            path = [ ]
+            node = start
+            while visited[node] == 0:
+                visited[node] = 1
+                path.append(node)
+                node = heads[node]
+
+            if visited[node] == 1:
+                return np.array(path[path.index(node):])
+
+            for pNode in path:
+                visited[pNode] = 2
+
+        return None
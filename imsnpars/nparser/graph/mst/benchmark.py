@@ -0,0 +1,196 @@
+'''
+Created on 18.10.2026
+
+@author: falensaa
+'''
+
+import argparse
+import itertools
+import logging
+import sys
+import timeit
+
+import numpy as np
+
+from imsnpars.tools import datatypes
+from imsnpars.nparser.graph.mst import cle, arraycle, eisner, gdatatypes
+
+ALGORITHMS = { "CLE" : cle.ChuLiuEdmonds,
+               "NCLE" : arraycle.ArrayChuLiuEdmonds,
+               "EISNER" : eisner.Eisner }
+
+###########################
+# score matrices
+###########################
+
+def randomScores(rng, length):
+    return rng.randn(length, length)
+
+def nestedCycleScores(rng, length):
+    """Tokens are grouped hierarchically (pairs, pairs of pairs, ...), arcs inside smaller groups score higher.
+
+    The best heads form a cycle in every pair, after contracting them again
+    in every pair of pairs, and so on."""
+    tokens = np.arange(length) - 1
+    levels = max(1, int(np.ceil(np.log2(max(length - 1, 2)))))
+
+    # the first level on which two tokens are in the same group
+    level = np.zeros((length, length), dtype=np.int64)
+    for lev in range(levels, -1, -1):
+        sameGroup = (tokens[:, None] >> lev) == (tokens[None, :] >> lev)
+        level[sameGroup] = lev
+
+    weights = 10.0 * (levels + 1 - level) + rng.rand(length, length)
+    weights[0, :] = rng.rand(length)
+    return weights
+
+def prunedScores(rng, length, keep = 0.3):
+    """Random scores with most of the arcs missing (-inf), the root arcs are always there"""
+    weights = rng.randn(length, length)
+    missing = rng.rand(length, length) > keep
+    missing[0, :] = False
+    weights[missing] = -np.inf
+    return weights
+
+SCORES = { "random" : randomScores,
+           "nested" : nestedCycleScores,
+           "pruned" : prunedScores }
+
+###########################
+# checks
+###########################
+
+def isTree(heads):
+    if heads[0] != -1:
+        return False
+
+    for dep in range(1, len(heads)):
+        seen = set()
+        node = dep
+        while node != 0:
+            if node in seen or heads[node] < 0 or heads[node] >= len(heads) or heads[node] == node:
+                return False
+            seen.add(node)
+            node = heads[node]
+
+    return True
+
+def treeWeight(weights, heads):
+    return sum(weights[heads[dep], dep] for dep in range(1, len(heads)))
+
+def bestTreeWeight(weights, projective):
+    """Weight of the best (projective) tree found by trying all the head assignments"""
+    best = -np.inf
+    length = len(weights)
+    for heads in itertools.product(range(length), repeat=length - 1):
+        heads = (-1, ) + heads
+        if not isTree(heads):
+            continue
+
+        if projective and not datatypes.Tree([ h - 1 for h in heads[1:] ]).isProjective():
+            continue
+
+        best = max(best, treeWeight(weights, heads))
+    return best
+
+def candidateMask(weights):
+    """The arcs which are not pruned (None if there are no pruned arcs)"""
+    candidates = np.isfinite(weights)
+    return None if candidates.all() else candidates
+
+def findHeads(mstAlg, weights, candidates = None):
+    return list(mstAlg.findMSTHeads(gdatatypes.SquareArrayScores(len(weights), weights, candidates)))
+
+def crossCheck(algorithms, rng, maxBruteLength = 6, repeats = 5, lengths = (10, 30, 60)):
+    """Returns the descriptions of all failed checks (empty if everything is right)"""
+    failures = [ ]
+
+    # small sentences: against brute force
+    for length, kind, _ in itertools.product(range(2, maxBruteLength + 1), sorted(SCORES), range(repeats)):
+        weights = SCORES[kind](rng, length)
+        for name, mstAlg in algorithms.items():
+            heads = findHeads(mstAlg, weights, candidateMask(weights))
+            projective = not mstAlg.handlesNonProjectiveTrees()
+            if not isTree(heads):
+                failures.append("%s: not a tree on %s scores, length %i: %s" % (name, kind, length, heads))
+            elif not np.isclose(treeWeight(weights, heads), bestTreeWeight(weights, projective)):
+                failures.append("%s: not the best tree on %s scores, length %i: %s" % (name, kind, length, heads))
+
+    # longer sentences: all the non-projective algorithms have to agree
+    nonProj = [ name for name in sorted(algorithms) if algorithms[name].handlesNonProjectiveTrees() ]
+    for length, kind, _ in itertools.product(lengths, sorted(SCORES), range(repeats)):
+        weights = SCORES[kind](rng, length)
+        found = { }
+        for name, mstAlg in algorithms.items():
+            heads = findHeads(mstAlg, weights, candidateMask(weights))
+            if not isTree(heads):
+                failures.append("%s: not a tree on %s scores, length %i" % (name, kind, length))
+            else:
+                found[name] = treeWeight(weights, heads)
+
+        nonProjWeights = [ found[name] for name in nonProj if name in found ]
+        if nonProjWeights and not np.allclose(nonProjWeights, nonProjWeights[0]):
+            failures.append("different tree weights on %s scores, length %i: %s" % (kind, length,
+                                                                                   ", ".join("%s=%.4f" % (name, found[name]) for name in nonProj if name in found)))
+
+    return failures
+
+###########################
+# timing
+###########################
+
+def benchmark(algorithms, lengths, repeats, rng, kinds = None, dense = False):
+    """Returns (algorithm, scores, length, mean ms, min ms) rows
+    
+    Pruned matrices are decoded with their candidate masks, unless 'dense' is set."""
+    rows = [ ]
+    for kind in kinds or sorted(SCORES):
+        for length in lengths:
+            matrices = [ SCORES[kind](rng, length + 1) for _ in range(repeats) ]
+            masks = [ None if dense else candidateMask(weights) for weights in matrices ]
+            for name in sorted(algorithms):
+                mstAlg = algorithms[name]
+                times = [ timeit.timeit(lambda: findHeads(mstAlg, weights, candidates), number=1) * 1000.0 for weights, candidates in zip(matrices, masks) ]
+                rows.append((name, kind, length, np.mean(times), np.min(times)))
+    return rows
+
+def formatTable(rows):
+    header = "| algorithm | scores | length | mean ms | min ms |\n|---|---|---:|---:|---:|"
+    lines = [ "| %s | %s | %i | %.3f | %.3f |" % row for row in rows ]
+    return "\n".join([ header ] + lines)
+
+def main():
+    argParser = argparse.ArgumentParser(description="""Benchmark and cross-check of the MST algorithms""")
+    argParser.add_argument("--algorithms", help="algorithms to compare", required=False, default=",".join(sorted(ALGORITHMS)))
+    argParser.add_argument("--lengths", help="sentence lengths (in tokens)", required=False, default="10,25,50,100,200,300")
+    argParser.add_argument("--scores", help="kinds of score matrices", required=False, default=",".join(sorted(SCORES)))
+    argParser.add_argument("--repeats", help="nr of matrices per length", type=int, required=False, default=5)
+    argParser.add_argument("--seed", help="random seed", type=int, required=False, default=42)
+    argParser.add_argument("--noCheck", help="only measure the time", action="store_true")
+    argParser.add_argument("--dense", help="decode pruned matrices without their candidate masks (as without --pruneK)", action="store_true")
+    args = argParser.parse_args()
+
+    logging.basicConfig(stream=sys.stderr, level=logging.INFO, format='[%(levelname)s] %(asctime)s %(name)s# %(message)s')
+
+    algorithms = { }
+    for name in args.algorithms.split(","):
+        if name not in ALGORITHMS:
+            logging.error("Unknown algorithm: %s" % name)
+            sys.exit()
+        algorithms[name] = ALGORITHMS[name]()
+
+    rng = np.random.RandomState(args.seed)
+    if not args.noCheck:
+        failures = crossCheck(algorithms, rng)
+        for failure in failures:
+            logging.error(failure)
+        logging.info("Cross-check: %i failures" % len(failures))
+
+    rows = benchmark(algorithms, [ int(l) for l in args.lengths.split(",") ], args.repeats, rng, args.scores.split(","), args.dense)
+    print(formatTable(rows))
+
+    if not args.noCheck and failures:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
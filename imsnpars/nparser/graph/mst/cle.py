@@ -5,67 +5,28 @@ Created on 21.09.2018
 '''
 
 import networkx
+import numpy as np
 
 from imsnpars.nparser.graph.mst import gdatatypes
 
-class SquareListScores(object):
-    def __init__(self, length):
-        self.outputs = [ ]
-        self.scores = [ ]
-        
-        for _ in range(length):
-            scoresRow = [ 0.0 ] * length
-            outputRow = [ None ] * length
-            self.outputs.append(outputRow)
-            self.scores.append(scoresRow)
-        
-    def addScore(self, hId, dId, score):
-        self.scores[hId+1][dId+1] = score
-        
-    def getScore(self, hId, dId):
-        return self.scores[hId+1][dId+1]
-    
-    def addOutput(self, hId, dId, output):
-        self.outputs[hId+1][dId+1] = output
-        
-    def getOutput(self, hId, dId):
-        return self.outputs[hId+1][dId+1]
-    
-class SquareListScoresWithDims(SquareListScores):
-    def __init__(self, length):
-        super().__init__(length)
-        self.dims = [ ]
-        
-        for _ in range(length):
-            dimRow = [ None ] * length
-            self.dims.append(dimRow)
-        
-    def addDim(self, hId, dId, dim):
-        self.dims[hId+1][dId+1] = dim
-        
-    def getDim(self, hId, dId):
-        return self.dims[hId+1][dId+1]
-    
 class ChuLiuEdmonds(gdatatypes.MaximumSpanningTreeAlgorithm):
+    """Chu-Liu-Edmonds on a networkx graph.
+    
+    If the scores come with a candidate mask (see pruning.ArcPruner) the graph
+    holds only the candidate arcs, otherwise all the arcs of the sentence."""
     
     def __init__(self):
-        pass
-        
-    def emptyScores(self, instance, dim = False):
-        if dim:
-            return SquareListScoresWithDims(len(instance.sentence) + 1)
-        
-        return SquareListScores(len(instance.sentence) + 1)
+        super().__init__()
      
     def handlesNonProjectiveTrees(self):
         return True
     
-    def findMST(self, weights):
-        graph = self.__buildInitialGraph(weights)
+    def findMST(self, weights, candidates = None):
+        graph = self.__buildInitialGraph(weights, candidates)
         return self.__runCLE(graph, len(graph.nodes()))
             
     def findMSTHeads(self, scores):
-        tree = self.findMST(scores.scores)
+        tree = self.findMST(scores.scores, scores.candidates)
         return self.__mstToHeads(tree)
      
     def __mstToHeads(self, tree):
@@ -85,10 +46,14 @@ class ChuLiuEdmonds(gdatatypes.MaximumSpanningTreeAlgorithm):
             self.__resolveCycle(contractedMST, cycle, nodeNr, backtrackIn, backtrackOut)
             return contractedMST
         
-    def __buildInitialGraph(self, weights):
+    def __buildInitialGraph(self, weights, candidates):
         g = networkx.DiGraph()
         g.add_nodes_from(range(len(weights)))
-        edges = [(i, j, weights[i][j]) for i in range(len(weights)) for j in range(1, len(weights)) if i != j and j != 0 ]
+        if candidates is None:
+            edges = [(i, j, weights[i][j]) for i in range(len(weights)) for j in range(1, len(weights)) if i != j and j != 0 ]
+        else:
+            heads, deps = np.nonzero(candidates)
+            edges = [(i, j, weights[i][j]) for i, j in zip(heads.tolist(), deps.tolist()) if i != j and j != 0 ]
         g.add_weighted_edges_from(edges)
         return g
     
@@ -128,7 +93,7 @@ class ChuLiuEdmonds(gdatatypes.MaximumSpanningTreeAlgorithm):
         cycleWeight = sum( graph[headC][nodeC]["weight"] for (headC, nodeC) in cycle )
         
         for node in cycleNodes:
-            graph.node[node]['in_cycle'] = cycleName
+            graph.nodes[node]['in_cycle'] = cycleName
             for h, d in graph.edges(node):
                 graph[h][d]["in_cycle"] = cycleName
         
@@ -141,18 +106,20 @@ class ChuLiuEdmonds(gdatatypes.MaximumSpanningTreeAlgorithm):
             if nodeG == cycleName or 'in_cycle' in attr:
                 continue
             
-            # edges leaving the cycle
-            if nodeG != 0:
-                bestWeight, bestNode = max([ (graph[nodeC][nodeG]["weight"], nodeC) for nodeC in cycleNodes ])
+            # edges leaving the cycle (with pruning not every node has one)
+            leaving = [ (graph[nodeC][nodeG]["weight"], nodeC) for nodeC in cycleNodes if graph.has_edge(nodeC, nodeG) ]
+            if nodeG != 0 and leaving:
+                bestWeight, bestNode = max(leaving)
                 graph.add_weighted_edges_from([(cycleName, nodeG, bestWeight)])
                 backtrackOut[nodeG] = bestNode
                 
             # edges entering the cycle
-            bestWeight, bestNode = max([ ( graph[nodeG][nodeC]["weight"] + cycleWeight - graph[headC][nodeC]["weight"], 
-                                           nodeC) for (headC, nodeC) in cycle ])
-            
-            graph.add_weighted_edges_from([(nodeG, cycleName, bestWeight)])
-            backtrackIn[nodeG] = bestNode
+            entering = [ ( graph[nodeG][nodeC]["weight"] + cycleWeight - graph[headC][nodeC]["weight"], nodeC)
+                         for (headC, nodeC) in cycle if graph.has_edge(nodeG, nodeC) ]
+            if entering:
+                bestWeight, bestNode = max(entering)
+                graph.add_weighted_edges_from([(nodeG, cycleName, bestWeight)])
+                backtrackIn[nodeG] = bestNode
             
         return backtrackIn, backtrackOut
     
@@ -0,0 +1,99 @@
+'''
+Created on 18.10.2026
+
+@author: falensaa
+'''
+
+import numpy as np
+
+from imsnpars.nparser.graph.mst import gdatatypes
+
+class Eisner(gdatatypes.MaximumSpanningTreeAlgorithm):
+    """First-order projective decoder (Eisner, 1996) over a (head x dependent) numpy score matrix.
+
+    All the spans of one width are filled at once, so the only Python loop
+    runs over span widths."""
+
+    def __init__(self):
+        super().__init__()
+
+    def handlesNonProjectiveTrees(self):
+        return False
+
+    def findMST(self, weights):
+        weights = np.array(weights, dtype=np.float64)
+        length = len(weights)
+
+        # no arcs entering the root
+        weights[:, 0] = -np.inf
+
+        # complete (C) and incomplete (I) spans headed to the right (R) or the left (L)
+        completeR = np.full((length, length), -np.inf)
+        completeL = np.full((length, length), -np.inf)
+        incompleteR = np.full((length, length), -np.inf)
+        incompleteL = np.full((length, length), -np.inf)
+        np.fill_diagonal(completeR, 0.0)
+        np.fill_diagonal(completeL, 0.0)
+
+        # split points
+        incompleteBack = np.zeros((length, length), dtype=np.int64)
+        completeRBack = np.zeros((length, length), dtype=np.int64)
+        completeLBack = np.zeros((length, length), dtype=np.int64)
+
+        for width in range(1, length):
+            starts = np.arange(0, length - width)
+            ends = starts + width
+            splits = starts[:, None] + np.arange(width)
+
+            # incomplete spans: s -> t or t -> s over two complete halves
+            joined = completeR[starts[:, None], splits] + completeL[splits + 1, ends[:, None]]
+            best = np.argmax(joined, axis=1)
+            bestScore = joined[np.arange(len(starts)), best]
+
+            incompleteR[starts, ends] = bestScore + weights[starts, ends]
+            incompleteL[starts, ends] = bestScore + weights[ends, starts]
+            incompleteBack[starts, ends] = splits[np.arange(len(starts)), best]
+
+            # complete spans headed by t, split in s..t-1
+            joined = completeL[starts[:, None], splits] + incompleteL[splits, ends[:, None]]
+            best = np.argmax(joined, axis=1)
+            completeL[starts, ends] = joined[np.arange(len(starts)), best]
+            completeLBack[starts, ends] = splits[np.arange(len(starts)), best]
+
+            # complete spans headed by s, split in s+1..t
+            joined = incompleteR[starts[:, None], splits + 1] + completeR[splits + 1, ends[:, None]]
+            best = np.argmax(joined, axis=1)
+            completeR[starts, ends] = joined[np.arange(len(starts)), best]
+            completeRBack[starts, ends] = splits[np.arange(len(starts)), best] + 1
+
+        heads = [ -1 ] * length
+        self.__backtrack(heads, incompleteBack, completeRBack, completeLBack)
+        return heads
+
+    def findMSTHeads(self, scores):
+        return self.findMST(scores.scores)
+
+    def __backtrack(self, heads, incompleteBack, completeRBack, completeLBack):
+        spans = [ (0, len(heads) - 1, True, True) ]
+        while spans:
+            start, end, complete, toRight = spans.pop()
+            if start == end:
+                continue
+
+            if complete and toRight:
+                split = completeRBack[start, end]
+                spans.append((start, split, False, True))
+                spans.append((split, end, True, True))
+            elif complete:
+                split = completeLBack[start, end]
+                spans.append((start, split, True, False))
+                spans.append((split, end, False, False))
+            else:
+                if toRight:
+                    heads[end] = start
+                else:
+                    heads[start] = end
+
+                split = incompleteBack[start, end]
+                spans.append((start, split, True, True))
+                spans.append((split + 1, end, True, False))
@@ -13,11 +13,14 @@ class MaximumSpanningTreeAlgorithm(object):
     __metaclass__ = abc.ABCMeta
     
     def __init__(self):
-        pass
+        self.__scoresBuffer = ScoresBuffer()
+    
+    def emptyScores(self, instance, candidates = None):
+        return self.__scoresBuffer.emptyScores(len(instance.sentence) + 1, candidates)
     
     def findMSTTree(self, scores):
         heads = self.findMSTHeads(scores)
-        return self.__buildTree(heads)
+        return self.headsToTree(heads)
     
     @abc.abstractmethod
     def findMSTHeads(self, scores):
@@ -27,30 +30,66 @@ class MaximumSpanningTreeAlgorithm(object):
     def handlesNonProjectiveTrees(self):
         return
     
-    def __buildTree(self, heads):
+    def headsToTree(self, heads):
         predictTree = datatypes.Tree([ el - 1 for el in heads[1:] ])
         return predictTree
     
 class SquareArrayScores(object):
-    def __init__(self, length):
+    """Scores of all the arcs as one (head x dependent) numpy matrix, the root is at position 0.
+    
+    Output expressions of the arcs are kept (optionally) in an output table,
+    see decoder.ArcOutputList and decoder.ArcOutputMatrix. If only some of the
+    arcs are candidates (see pruning.ArcPruner) the remaining arcs score -inf."""
+    
+    def __init__(self, length, scores = None, candidates = None):
         self.length = length
-        self.outputs = [ None ] * ( length * length )
-        self.scores = np.zeros(length * length)
+        self.scores = scores if scores is not None else np.zeros((length, length))
+        self.candidates = candidates
+        self.outputTable = None
         
     def addScore(self, hId, dId, score):
-        self.scores[self.__get_index(hId, dId)] = score
+        self.scores[hId + 1, dId + 1] = score
         
-    def addOutput(self, hId, dId, output):
-        self.outputs[self.__get_index(hId, dId)] = output
+    def setScores(self, arcScores):
+        """Takes all the scores at once as a (head x dependent) numpy matrix"""
+        self.scores[:, :] = arcScores
+        
+    def setCandidateScores(self, arcScores, order = "C"):
+        """Takes the scores of the candidate arcs only, in head-major (C) or dependent-major (F) order"""
+        if order == "C":
+            self.scores[self.candidates] = arcScores
+        else:
+            self.scores.T[self.candidates.T] = arcScores
         
     def getScore(self, hId, dId):
-        return self.scores[self.__get_index(hId, dId)]
+        return self.scores[hId + 1, dId + 1]
     
+    def setOutputTable(self, outputTable):
+        self.outputTable = outputTable
+        
     def getOutput(self, hId, dId):
-        return self.outputs[self.__get_index(hId, dId)]
+        return self.outputTable.getOutput(hId, dId)
+    
+    def copy(self):
+        """A copy with its own score matrix (the matrices of emptyScores share one buffer)"""
+        result = SquareArrayScores(self.length, self.scores.copy(), self.candidates)
+        result.setOutputTable(self.outputTable)
+        return result
     
-    def __get_index(self, hId, dId):
-        index = hId + 1
-        index = index * self.length + dId + 1
-        return index
-    
\ No newline at end of file
+    def getOutputValues(self, arcs):
+        """Values of the outputs of many (head, dependent) arcs at once, one column per arc"""
+        return self.outputTable.getOutputValues(arcs)
+    
+class ScoresBuffer(object):
+    """Shares one buffer between the scores of all sentences of the same or smaller length"""
+    
+    def __init__(self):
+        self.__buffer = np.zeros(0)
+        
+    def emptyScores(self, length, candidates = None):
+        if length * length > len(self.__buffer):
+            self.__buffer = np.zeros(length * length)
+        
+        scores = self.__buffer[:length * length].reshape((length, length))
+        scores.fill(0.0 if candidates is None else -np.inf)
+        return SquareArrayScores(length, scores, candidates)
@@ -10,13 +10,34 @@ def addParserCmdArguments(argParser):
     graphArgs = argParser.add_argument_group('Graph-based parser')
     
     # mst algorithm
-    graphArgs.add_argument("--mst", help="mst algorithm", choices=[ "CLE" ], required=False, default="CLE")
+    graphArgs.add_argument("--mst", help="mst algorithm", choices=[ "CLE", "NCLE", "EISNER" ], required=False, default="CLE")
     graphArgs.add_argument("--augment", help="augment training as described in K&G", choices=[ "True", "False" ], required=False, default="True")
+    graphArgs.add_argument("--scorer", help="score every arc with its own MLP (pairwise), all arcs with a few matrix operations (batched) or all arcs forward-only, building expressions only for the arcs in the losses (lazy)", choices=[ "pairwise", "batched", "lazy" ], required=False, default="pairwise")
+    graphArgs.add_argument("--lblScoring", help="with the graph labeler: score labels together with every arc (joint) or score unlabeled arcs and label only the arcs of the tree (factorized)", choices=[ "joint", "factorized" ], required=False, default="joint")
     graphArgs.add_argument("--features", help="graph features (combination of {h,d})", required=False, default="h,d")
+    graphArgs.add_argument("--pruneK", help="keep only k candidate heads of every dependent (found by a cheap first-order scorer) before scoring arcs with the MLP, 0 turns pruning off", required=False, type=int, default=0)
+    graphArgs.add_argument("--arcFilter", help="rule out arcs (head POS, dependent POS, direction, distance) never seen in the training data before scoring", choices=[ "True", "False" ], required=False, default="False")
+    graphArgs.add_argument("--pruneMinLength", help="prune only sentences with at least that many tokens", required=False, type=int, default=0)
+    graphArgs.add_argument("--pruneRank", help="rank of the bilinear first-order scorer used for pruning", required=False, type=int, default=32)
+    graphArgs.add_argument("--predictPruneK", help="k used when predicting with a model trained with --pruneK (default: the k of the model), 0 predicts on all the arcs", required=False, type=int, default=None)
+    graphArgs.add_argument("--pruneReport", help="predict the pruned sentences with gold heads also on all the arcs and log UAS/LAS and time of both (not with --decodeWorkers)", choices=[ "True", "False" ], required=False, default="False")
     
 def fillParserOptions(args, opts):
     opts.mst = args.mst
+    opts.scorer = args.scorer
+    opts.lblScoring = args.lblScoring
     opts.features = args.features.split(",")
     opts.augment = utils.parseBoolean(args.augment)
+    opts.pruneK = args.pruneK
+    opts.pruneMinLength = args.pruneMinLength
+    opts.pruneRank = args.pruneRank
+    opts.arcFilter = utils.parseBoolean(args.arcFilter)
+    
+    return fillPredictionOptions(args, opts)
+
+def fillPredictionOptions(args, opts):
+    """Options taken from the command line also for loaded models"""
+    opts.predictPruneK = args.predictPruneK
+    opts.pruneReport = utils.parseBoolean(args.pruneReport)
     
     return opts
\ No newline at end of file
@@ -0,0 +1,177 @@
+'''
+Created on 18.10.2026
+
+@author: falensaa
+'''
+
+import logging
+import dynet
+import numpy as np
+
+from imsnpars.tools import evaluator
+
+class ArcPruner(object):
+    """Keeps the k best candidate heads of every dependent before the arcs are scored by the MLP.
+
+    The first-pass score is a low-rank bilinear product of the token vectors
+    plus a bias for the (signed, clipped) distance between head and dependent.
+    It is trained jointly with the parser (cross-entropy over the heads of
+    every dependent). The root is always kept as a candidate, so a tree can
+    always be built from the candidates. With k = 0 nothing is pruned (the
+    scorer is still a part of the model)."""
+
+    def __init__(self, k, minLength, rank, reprLayer, maxDist = 10):
+        self.__logger = logging.getLogger(self.__class__.__name__)
+
+        self.__k = k
+        self.__minLength = minLength
+        self.__rank = rank
+        self.__reprLayer = reprLayer
+        self.__maxDist = maxDist
+
+        self.__headProj = None
+        self.__depProj = None
+        self.__distBias = None
+
+        # sentence length -> distance buckets of all arcs
+        self.__distIndices = { }
+        self.__resetStats()
+
+    def initializeParameters(self, model, reprDim):
+        self.__headProj = model.add_parameters((self.__rank, reprDim))
+        self.__depProj = model.add_parameters((self.__rank, reprDim))
+        self.__distBias = model.add_parameters((2 * self.__maxDist + 1, 1))
+
+    def buildLosses(self, instance, vectors):
+        length = len(instance.sentence) + 1
+        if length < 2:
+            return [ ]
+
+        scores = self.__buildScores(vectors, length)
+
+        # every dependent is one batch element, the softmax goes over its heads
+        depScores = dynet.reshape(dynet.select_cols(scores, list(range(1, length))), (length,), batch_size = length - 1)
+        correctHeads = [ head + 1 for head in instance.correctTree.toList() ]
+        return [ dynet.sum_batches(dynet.pickneglogsoftmax_batch(depScores, correctHeads)) ]
+
+    def findCandidates(self, instance, vectors, allowed = None):
+        """Returns a (head x dependent) mask of the kept arcs, chosen among the 'allowed' ones (a mask, None for all)
+        
+        If the sentence is not pruned 'allowed' is returned unchanged."""
+        nrOfTokens = len(instance.sentence)
+        if self.__k <= 0 or nrOfTokens < self.__minLength or nrOfTokens - 1 <= self.__k:
+            return allowed
+
+        length = nrOfTokens + 1
+
+        scores = self.__buildScores(vectors, length).npvalue()
+        np.fill_diagonal(scores, -np.inf)
+        if allowed is not None:
+            scores[~allowed] = -np.inf
+
+        candidates = np.zeros((length, length), dtype=bool)
+        bestHeads = np.argpartition(-scores[:, 1:], self.__k - 1, axis=0)[:self.__k]
+        candidates[bestHeads, np.arange(1, length)] = True
+        candidates[0, 1:] = True
+        if allowed is not None:
+            candidates &= allowed
+
+        self.__updateStats(instance, candidates)
+        return candidates
+
+    def logStats(self):
+        if self.__sentences == 0:
+            return
+
+        goldStr = "%.2f" % (100.0 * self.__keptGold / self.__allGold) if self.__allGold > 0 else "n/a"
+        arcsStr = "%.2f" % (100.0 * self.__keptArcs / self.__allArcs) if self.__allArcs > 0 else "n/a"
+        self.__logger.info("Pruned %i sentences (k=%i), kept arcs between tokens: %s%%, kept gold heads: %s%%" % (self.__sentences, self.__k,
+                                                                                                                arcsStr, goldStr))
+        self.__resetStats()
+
+    def __buildScores(self, vectors, length):
+        tokVectors = dynet.concatenate_cols([ self.__getLayer(vectors.rootV) ] + [ self.__getLayer(vec) for vec in vectors.wordsV ])
+        headProj = self.__headProj.expr() * tokVectors
+        depProj = self.__depProj.expr() * tokVectors
+
+        distBias = dynet.reshape(dynet.select_rows(self.__distBias.expr(), self.__getDistIndices(length)), (length, length))
+        return dynet.transpose(headProj) * depProj + distBias
+
+    def __getDistIndices(self, length):
+        if length not in self.__distIndices:
+            positions = np.arange(length)
+            dists = np.clip(positions[None, :] - positions[:, None], -self.__maxDist, self.__maxDist) + self.__maxDist
+
+            # dynet matrices are column-major
+            self.__distIndices[length] = np.ravel(dists, order="F").tolist()
+
+        return self.__distIndices[length]
+
+    def __getLayer(self, vector):
+        if self.__reprLayer == None:
+            return vector
+        else:
+            return vector[self.__reprLayer]
+
+    def __updateStats(self, instance, candidates):
+        length = len(instance.sentence)
+        self.__sentences += 1
+        
+        # arcs between two tokens only, the root arcs are always kept
+        tokenArcs = candidates[1:, 1:]
+        self.__keptArcs += np.count_nonzero(tokenArcs) - np.count_nonzero(np.diagonal(tokenArcs))
+        self.__allArcs += length * (length - 1)
+
+        for dId, tok in enumerate(instance.sentence):
+            if tok.headId != None:
+                self.__allGold += 1
+                self.__keptGold += 1 if candidates[tok.getHeadPos() + 1, dId + 1] else 0
+
+    def __resetStats(self):
+        self.__sentences = 0
+        self.__keptArcs = 0
+        self.__allArcs = 0
+        self.__keptGold = 0
+        self.__allGold = 0
+
+class PruningReport(object):
+    """Compares the prediction of the pruned sentences with the prediction on all the (allowed) arcs.
+    
+    Only sentences with all the gold heads are compared. The accuracy and the
+    time (first-pass scoring, arc scoring and decoding) of both predictions
+    are logged by logStats, LAS only if the parser predicts the labels."""
+    
+    def __init__(self):
+        self.__logger = logging.getLogger(self.__class__.__name__)
+        self.__prunedEval = evaluator.LazyTreeEvaluator()
+        self.__fullEval = evaluator.LazyTreeEvaluator()
+        self.__resetStats()
+        
+    def hasGoldHeads(self, instance):
+        return all(tok.headId != None for tok in instance.sentence)
+    
+    def processTrees(self, instance, prunedTree, prunedTime, fullTree, fullTime):
+        self.__prunedEval.processTree(instance.sentence, prunedTree)
+        self.__fullEval.processTree(instance.sentence, fullTree)
+        self.__prunedTime += prunedTime
+        self.__fullTime += fullTime
+        self.__sentences += 1
+        self.__labeled = prunedTree.getLabels() != None
+        
+    def logStats(self):
+        if self.__sentences == 0:
+            return
+        
+        for name, treeEval, predTime in [ ("pruned", self.__prunedEval, self.__prunedTime), ("all arcs", self.__fullEval, self.__fullTime) ]:
+            lasStr = "%.2f" % treeEval.calcLAS() if self.__labeled else "n/a"
+            self.__logger.info("Prediction on %s (%i sentences): UAS=%.2f LAS=%s, time: %.2f s" % (name, self.__sentences, treeEval.calcUAS(), lasStr, predTime))
+        
+        self.__resetStats()
+        
+    def __resetStats(self):
+        self.__prunedEval.reset()
+        self.__fullEval.reset()
+        self.__prunedTime = 0.0
+        self.__fullTime = 0.0
+        self.__sentences = 0
+        self.__labeled = False
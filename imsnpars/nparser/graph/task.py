@@ -5,28 +5,49 @@ Created on 23.08.2017
 '''
 
 import logging
+import timeit
+import dynet
 import numpy as np
 
 from imsnpars.tools import neural
 
 class NNGraphParsingTask(neural.NNTreeTask):
-    def __init__(self, mstAlg, featReprBuilder, decod, network, augmentScore):
+    def __init__(self, mstAlg, featReprBuilder, decod, network, augmentScore, pruner = None, arcFilter = None, pruneReport = None):
         self.__mst = mstAlg
         self.__featReprBuilder = featReprBuilder
         self.__decoder = decod
         self.__network = network
         self.__augmentScore = augmentScore
+        self.__pruner = pruner
+        self.__arcFilter = arcFilter
+        self.__pruneReport = pruneReport
         self.__logger = logging.getLogger(self.__class__.__name__)
     
     def handlesNonProjectiveTrees(self):
-        return True
+        return self.__mst.handlesNonProjectiveTrees()
+    
+    def readData(self, sentences):
+        if self.__arcFilter != None:
+            self.__arcFilter.readData(sentences)
+            
+    def save(self, pickleOut):
+        if self.__arcFilter != None:
+            self.__arcFilter.save(pickleOut)
+    
+    def load(self, pickleIn):
+        if self.__arcFilter != None:
+            self.__arcFilter.load(pickleIn)
     
     def initializeParameters(self, model, reprDim):
         self.__featReprBuilder.initializeParameters(model, reprDim)
         self.__network.initializeParameters(model, reprDim, 1)
+        
+        if self.__pruner != None:
+            self.__pruner.initializeParameters(model, reprDim)
              
     def renewNetwork(self):
         self.__network.renewNetwork()
+        self.__featReprBuilder.renewNetwork()
         
     def buildLosses(self, vectors, instance, currentEpoch, predictTrain = True):
         scores = self.__mst.emptyScores(instance) 
@@ -48,99 +69,245 @@ class NNGraphParsingTask(neural.NNTreeTask):
     
         errors = self.__decoder.findErrors(scores, instance.correctTree, predictTree)
         losses = self.__network.buildLosses(errors)
+        
+        if self.__pruner != None:
+            losses.extend(self.__pruner.buildLosses(instance, vectors))
             
         return losses, predictTrainTree
     
     def predict(self, instance, vectors):
-        scores = self.__mst.emptyScores(instance) 
-        self.__decoder.calculateScores(instance, vectors, self.__network, scores, isTraining=False)
-        predictTree = self.__mst.findMSTTree(scores)
+        startTime = timeit.default_timer()
+        allowed = self.__findAllowedArcs(instance)
+        candidates = self.__findCandidates(instance, vectors, allowed)
+        predictTree = self.__predictOnArcs(instance, vectors, candidates)
+        
+        if self.__pruneReport != None and candidates is not allowed and self.__pruneReport.hasGoldHeads(instance):
+            prunedTime = timeit.default_timer() - startTime
+            startTime = timeit.default_timer()
+            fullTree = self.__predictOnArcs(instance, vectors, allowed)
+            self.__pruneReport.processTrees(instance, predictTree, prunedTime, fullTree, timeit.default_timer() - startTime)
+            
         return predictTree
     
+    def __predictOnArcs(self, instance, vectors, candidates):
+        scores = self.__mst.emptyScores(instance, candidates) 
+        self.__decoder.calculateScores(instance, vectors, self.__network, scores, isTraining=False)
+        return self.__mst.findMSTTree(scores)
+    
+    def supportsPipelinedDecoding(self):
+        return True
+    
+    def getMSTAlgorithm(self):
+        return self.__mst
+    
+    def predictScores(self, instance, vectors):
+        candidates = self.__findCandidates(instance, vectors, self.__findAllowedArcs(instance))
+        scores = self.__mst.emptyScores(instance, candidates) 
+        self.__decoder.calculateScores(instance, vectors, self.__network, scores, isTraining=False)
+        return scores.copy()
+    
+    def predictFromHeads(self, instance, vectors, scores, heads):
+        return self.__mst.headsToTree(heads)
+    
+    def finishPrediction(self):
+        if self.__arcFilter != None:
+            self.__arcFilter.logStats()
+        if self.__pruner != None:
+            self.__pruner.logStats()
+        if self.__pruneReport != None:
+            self.__pruneReport.logStats()
+            
+    def __findAllowedArcs(self, instance):
+        return self.__arcFilter.findAllowedArcs(instance) if self.__arcFilter != None else None
+    
+    def __findCandidates(self, instance, vectors, allowed):
+        if self.__pruner != None:
+            return self.__pruner.findCandidates(instance, vectors, allowed)
+        else:
+            return allowed
+    
     
 ####################
 # with labels together with arcs
 ####################
 
 class NNGraphParsingTaskWithLbl(neural.NNTreeTask):
-    def __init__(self, mstAlg, featReprBuilder, decod, network, augmentScore, lblDict):
+    def __init__(self, mstAlg, featReprBuilder, decod, network, augmentScore, lblDict, pruner = None, arcFilter = None, factorizedLbls = False, pruneReport = None):
         self.__mst = mstAlg
         self.__featReprBuilder = featReprBuilder
         self.__decoder = decod
         self.__network = network
         self.__augmentScore = augmentScore
         self.__lblDict = lblDict
+        self.__pruner = pruner
+        self.__arcFilter = arcFilter
+        self.__pruneReport = pruneReport
+        
+        # unlabeled arc scores for decoding, labels scored only for the arcs of the tree
+        self.__factorizedLbls = factorizedLbls
         self.__logger = logging.getLogger(self.__class__.__name__)
     
     def getLblDict(self):
         return self.__lblDict
     
     def handlesNonProjectiveTrees(self):
-        return True
+        return self.__mst.handlesNonProjectiveTrees()
+    
+    def readData(self, sentences):
+        if self.__arcFilter != None:
+            self.__arcFilter.readData(sentences)
+            
+    def save(self, pickleOut):
+        if self.__arcFilter != None:
+            self.__arcFilter.save(pickleOut)
+    
+    def load(self, pickleIn):
+        if self.__arcFilter != None:
+            self.__arcFilter.load(pickleIn)
     
     def initializeParameters(self, model, reprDim):
         self.__featReprBuilder.initializeParameters(model, reprDim)
-        self.__network.initializeParameters(model, reprDim, self.__lblDict.getNrOfLbls())
+        if self.__factorizedLbls:
+            self.__network.initializeParameters(model, reprDim, 1, secondaryOutDim = self.__lblDict.getNrOfLbls())
+        else:
+            self.__network.initializeParameters(model, reprDim, self.__lblDict.getNrOfLbls())
+        
+        if self.__pruner != None:
+            self.__pruner.initializeParameters(model, reprDim)
              
     def renewNetwork(self):
         self.__network.renewNetwork()
+        self.__featReprBuilder.renewNetwork()
         
     def buildLosses(self, vectors, instance, currentEpoch, predictTrain = True):    
         scores = self.__mst.emptyScores(instance)
         self.__decoder.calculateScores(instance, vectors, self.__network, scores, isTraining=True)
         
+        # labels of the tree used for the losses are needed only when scored together with the arcs
+        withLbls = not self.__factorizedLbls
+        
         # decoding twice to get the augmented tree
         if predictTrain:
-            predictTrainTree = self.__predictTree(scores)
+            predictTrainTree = self.__predictTree(instance, vectors, scores, isTraining=True)
         else:
             predictTrainTree = None
 
         if self.__augmentScore:
             self.__decoder.augmentScores(scores, instance)
-            predictTree = self.__predictTree(scores)
+            predictTree = self.__predictTree(instance, vectors, scores, isTraining=True, withLbls=withLbls)
         elif predictTrain:
             predictTree = predictTrainTree
         else:
-            predictTree = self.__predictTree(scores)
+            predictTree = self.__predictTree(instance, vectors, scores, isTraining=True, withLbls=withLbls)
+        
+        if self.__factorizedLbls:
+            errors = self.__decoder.findErrors(scores, instance.correctTree, predictTree)
+            losses = self.__network.buildLosses(errors) + self.__buildLblLosses(instance, vectors)
+        else:
+            errors = self.__findErrors(scores, instance.correctTree, predictTree)
+            losses = self.__network.buildLosses(errors) 
+        
+        if self.__pruner != None:
+            losses.extend(self.__pruner.buildLosses(instance, vectors))
             
-        errors = self.__findErrors(scores, instance.correctTree, predictTree)
-        losses = self.__network.buildLosses(errors) 
         return losses, predictTrainTree
     
     def __findErrors(self, outputs, correct, predicted):
-        errs = [ ]
+        correctHeads, correctLbls = correct.toList(), correct.getLabels()
+        predictedHeads, predictedLbls = predicted.toList(), predicted.getLabels()
         
-        for tPos in range(correct.nrOfTokens()):
-            if correct.getHead(tPos) == predicted.getHead(tPos) and correct.getLabel(tPos) == predicted.getHead(tPos):
-                continue
-            
-            corrHead = correct.getHead(tPos)
-            corrLblId = self.__lblDict.getLblId(correct.getLabel(tPos))
-            predHead = predicted.getHead(tPos)
-            predLblId = self.__lblDict.getLblId(predicted.getLabel(tPos))
-            
-            errs.append((outputs.getOutput(predHead, tPos)[predLblId], outputs.getOutput(corrHead, tPos)[corrLblId]))
+        wrongArcs = np.not_equal(correctHeads, predictedHeads) | np.not_equal(correctLbls, predictedLbls)
+        
+        errs = [ ]
+        for tPos in np.flatnonzero(wrongArcs).tolist():
+            corrLblId = self.__lblDict.getLblId(correctLbls[tPos])
+            predLblId = self.__lblDict.getLblId(predictedLbls[tPos])
+            errs.append((outputs.getOutput(predictedHeads[tPos], tPos)[predLblId], outputs.getOutput(correctHeads[tPos], tPos)[corrLblId]))
            
         return errs
     
-    def __predictTree(self, scores):
+    def __buildLblLosses(self, instance, vectors):
+        correct = instance.correctTree
+        arcs = [ (correct.getHead(dId), dId) for dId in range(correct.nrOfTokens()) ]
+        lblOuts = self.__decoder.calculateLblScores(instance, vectors, self.__network, arcs, isTraining=True)
+        
+        # the best wrong label of every arc
+        correctLbls = np.array([ self.__lblDict.getLblId(lbl) for lbl in correct.getLabels() ], dtype=np.int64)
+        lblValues = np.reshape(lblOuts.npvalue(), (-1, len(arcs)), order="F")
+        lblValues[correctLbls, np.arange(len(arcs))] = -np.inf
+        predictedLbls = np.argmax(lblValues, axis=0)
+        
+        return [ self.__network.buildLoss(dynet.pick(lblOuts, pos, 1), corrLbl, predLbl)
+                 for pos, (corrLbl, predLbl) in enumerate(zip(correctLbls.tolist(), predictedLbls.tolist())) ]
+    
+    def __predictTree(self, instance, vectors, scores, isTraining, withLbls = True):
         tree = self.__mst.findMSTTree(scores)
+        if not withLbls:
+            return tree
         
-        labels = [ ]
-        for dId in range(tree.nrOfTokens()):
-            hId = tree.getHead(dId)
-            
-            output = scores.getOutput(hId, dId)
-            maxDim = np.argmax(output.value())
-            
-            lbl = self.__lblDict.getLbl(maxDim)
-            labels.append(lbl)
+        return self.__labelTree(instance, vectors, scores, tree, isTraining)
+    
+    def __labelTree(self, instance, vectors, scores, tree, isTraining):
+        # label scores of all the tree arcs as one matrix
+        arcs = [ (tree.getHead(dId), dId) for dId in range(tree.nrOfTokens()) ]
+        if self.__factorizedLbls:
+            lblOuts = self.__decoder.calculateLblScores(instance, vectors, self.__network, arcs, isTraining)
+            lblValues = np.reshape(lblOuts.npvalue(), (-1, len(arcs)), order="F")
+        else:
+            lblValues = scores.getOutputValues(arcs)
+        
+        lblIds = np.argmax(lblValues, axis=0)
         
-        tree.setLabels(labels)
+        tree.setLabels([ self.__lblDict.getLbl(lblId) for lblId in lblIds.tolist() ])
         return tree
         
     def predict(self, instance, vectors):
-        scores = self.__mst.emptyScores(instance) 
+        startTime = timeit.default_timer()
+        allowed = self.__findAllowedArcs(instance)
+        candidates = self.__findCandidates(instance, vectors, allowed)
+        predictTree = self.__predictOnArcs(instance, vectors, candidates)
+        
+        if self.__pruneReport != None and candidates is not allowed and self.__pruneReport.hasGoldHeads(instance):
+            prunedTime = timeit.default_timer() - startTime
+            startTime = timeit.default_timer()
+            fullTree = self.__predictOnArcs(instance, vectors, allowed)
+            self.__pruneReport.processTrees(instance, predictTree, prunedTime, fullTree, timeit.default_timer() - startTime)
+            
+        return predictTree
+    
+    def __predictOnArcs(self, instance, vectors, candidates):
+        scores = self.__mst.emptyScores(instance, candidates) 
         self.__decoder.calculateScores(instance, vectors, self.__network, scores, isTraining=False)
-        predictTree = self.__predictTree(scores)
-        return predictTree
\ No newline at end of file
+        return self.__predictTree(instance, vectors, scores, isTraining=False)
+    
+    def supportsPipelinedDecoding(self):
+        return True
+    
+    def getMSTAlgorithm(self):
+        return self.__mst
+    
+    def predictScores(self, instance, vectors):
+        candidates = self.__findCandidates(instance, vectors, self.__findAllowedArcs(instance))
+        scores = self.__mst.emptyScores(instance, candidates) 
+        self.__decoder.calculateScores(instance, vectors, self.__network, scores, isTraining=False)
+        return scores.copy()
+    
+    def predictFromHeads(self, instance, vectors, scores, heads):
+        return self.__labelTree(instance, vectors, scores, self.__mst.headsToTree(heads), isTraining=False)
+    
+    def finishPrediction(self):
+        if self.__arcFilter != None:
+            self.__arcFilter.logStats()
+        if self.__pruner != None:
+            self.__pruner.logStats()
+        if self.__pruneReport != None:
+            self.__pruneReport.logStats()
+            
+    def __findAllowedArcs(self, instance):
+        return self.__arcFilter.findAllowedArcs(instance) if self.__arcFilter != None else None
+    
+    def __findCandidates(self, instance, vectors, allowed):
+        if self.__pruner != None:
+            return self.__pruner.findCandidates(instance, vectors, allowed)
+        else:
+            return allowed
\ No newline at end of file
@@ -61,6 +61,7 @@ class LabelerGraphTask(neural.NNTreeTask):
         
     def renewNetwork(self):
         self.__network.renewNetwork()
+        self.__featReprBuilder.renewNetwork()
     
     def buildLosses(self, vectors, instance, currentEpoch, predictTrain = True):
         outputsLbls = self.__buildLblOutputs(instance, instance.correctTree, vectors, isTraining=True)
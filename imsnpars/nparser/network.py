@@ -10,6 +10,10 @@ import dynet
 import numpy as np
 from imsnpars.tools import neural
 
+# numpy counterparts of the non-linear functions (used for the forward-only computations)
+NUMPY_NON_LIN_FUNS = { dynet.tanh : np.tanh,
+                       dynet.rectify : lambda x : np.maximum(x, 0.0),
+                       dynet.logistic : lambda x : 1.0 / (1.0 + np.exp(-x)) }
 
 class ParserNetwork(neural.NNetwork):
     def __init__(self, mlpHiddenDim, nonLinFun, featIds):
@@ -23,6 +27,8 @@ class ParserNetwork(neural.NNetwork):
         self.__paramsMlpHiddenBias = None
         self.__paramsMlpOutputW = None
         self.__paramsMlpOutputBias = None
+        self.__paramsMlpSecondaryW = None
+        self.__paramsMlpSecondaryBias = None
          
         # network layers
         self.__hidLayers = { }
@@ -30,15 +36,21 @@ class ParserNetwork(neural.NNetwork):
         self.__hiddenBias = None
         self.__outputW = None
         self.__outputBias = None
+        self.__secondaryW = None
+        self.__secondaryBias = None
         
         self.__nonLinFun = nonLinFun
+        self.__npNonLinFun = NUMPY_NON_LIN_FUNS.get(nonLinFun)
+        
+        # values of the output parameters (numpy), valid until the network is renewed
+        self.__paramValues = None
         
         for featId in featIds:
             self.__paramsMlpHidLayers[featId] = None
             self.__hidLayers[featId] = None
         
     # NNetwork method
-    def initializeParameters(self, model, inputDim, outDim):
+    def initializeParameters(self, model, inputDim, outDim, secondaryOutDim = 0):
         # MLP parameters
         for featId in self.__paramsMlpHidLayers:
             self.__paramsMlpHidLayers[featId] = model.add_parameters((self.__mlpHiddenDim, inputDim))
@@ -50,6 +62,12 @@ class ParserNetwork(neural.NNetwork):
         self.__paramsMlpOutputW = model.add_parameters((outDim, self.__mlpHiddenDim))
         self.__paramsMlpOutputBias = model.add_parameters((outDim))
         
+        # another output layer on top of the same hidden layer
+        if secondaryOutDim > 0:
+            self.__logger.debug("Initialize secondary output: (%i, %i)" % (secondaryOutDim, self.__mlpHiddenDim))
+            self.__paramsMlpSecondaryW = model.add_parameters((secondaryOutDim, self.__mlpHiddenDim))
+            self.__paramsMlpSecondaryBias = model.add_parameters((secondaryOutDim))
+        
     # NNetwork method
     def renewNetwork(self):
         for featId in self.__paramsMlpHidLayers:
@@ -58,6 +76,9 @@ class ParserNetwork(neural.NNetwork):
         self.__hiddenBias = self.__paramsMlpHiddenBias
         self.__outputW = self.__paramsMlpOutputW
         self.__outputBias = self.__paramsMlpOutputBias
+        self.__secondaryW = self.__paramsMlpSecondaryW
+        self.__secondaryBias = self.__paramsMlpSecondaryBias
+        self.__paramValues = None
     
     # NNetwork method
     def buildOutput(self, inputRepr, isTraining):
@@ -65,6 +86,41 @@ class ParserNetwork(neural.NNetwork):
         outLayer = self.__outputW * hiddenOut + self.__outputBias
         return outLayer
     
+    def buildOutputs(self, inputReprs, isTraining):
+        """Applies the MLP to a matrix of summed feature representations, one column per input"""
+        hiddenOut = self.__nonLinFun(dynet.colwise_add(inputReprs, self.__hiddenBias.expr()))
+        outLayer = dynet.colwise_add(self.__outputW * hiddenOut, self.__outputBias.expr())
+        return outLayer
+    
+    def buildSecondaryOutput(self, inputRepr, isTraining):
+        """Same as buildOutput, but uses the secondary output layer"""
+        hiddenOut = self.__nonLinFun(inputRepr + self.__hiddenBias)
+        return self.__secondaryW * hiddenOut + self.__secondaryBias
+    
+    def buildSecondaryOutputs(self, inputReprs, isTraining):
+        """Same as buildOutputs, but uses the secondary output layer"""
+        hiddenOut = self.__nonLinFun(dynet.colwise_add(inputReprs, self.__hiddenBias.expr()))
+        return dynet.colwise_add(self.__secondaryW * hiddenOut, self.__secondaryBias.expr())
+    
+    def evaluateOutputs(self, inputReprs):
+        """Same as buildOutputs, but forward-only: takes and returns numpy matrices"""
+        hiddenBias, outputW, outputBias, _, _ = self.__getParamValues()
+        hiddenOut = self.__npNonLinFun(inputReprs + hiddenBias[:, None])
+        return np.dot(outputW, hiddenOut) + outputBias[:, None]
+    
+    def evaluateSecondaryOutputs(self, inputReprs):
+        """Same as evaluateOutputs, but uses the secondary output layer"""
+        hiddenBias, _, _, secondaryW, secondaryBias = self.__getParamValues()
+        hiddenOut = self.__npNonLinFun(inputReprs + hiddenBias[:, None])
+        return np.dot(secondaryW, hiddenOut) + secondaryBias[:, None]
+    
+    def __getParamValues(self):
+        if self.__paramValues is None:
+            secondary = (self.__secondaryW.as_array(), self.__secondaryBias.as_array()) if self.__secondaryW is not None else (None, None)
+            self.__paramValues = (self.__hiddenBias.as_array(), self.__outputW.as_array(), self.__outputBias.as_array()) + secondary
+            
+        return self.__paramValues
+    
     def buildFeatOutput(self, featId, featVec, isTraining):
         return self.__hidLayers[featId] * featVec
     
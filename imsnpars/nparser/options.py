@@ -107,3 +107,9 @@ def fillParserOptions(args, opts):
     loptions.fillLabelerOptions(args, opts)
     return opts
 
+def fillPredictionOptions(args, opts):
+    """Overwrites the options of a loaded model which may change at prediction"""
+    if args.parser == "GRAPH":
+        opts = goptions.fillPredictionOptions(args, opts)
+        
+    return opts
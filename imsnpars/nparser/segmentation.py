@@ -0,0 +1,107 @@
+'''
+Created on 18.10.2026
+
+@author: falensaa
+'''
+
+import logging
+
+from collections import deque
+
+from imsnpars.tools import datatypes
+
+# label of the roots of the following windows attached to the first root
+REATTACHED_LBL = "dep"
+
+def splitSentence(sentence, maxLength):
+    """Splits a sentence into windows of at most maxLength tokens (not split if maxLength <= 0)
+    
+    The tokens of the windows are copies with the ids counted from the start
+    of the window, gold heads outside the window are unknown (None)."""
+    if maxLength <= 0 or len(sentence) <= maxLength:
+        return [ sentence ]
+
+    return [ rebaseWindow(sentence[start:start + maxLength], start) for start in range(0, len(sentence), maxLength) ]
+
+def rebaseWindow(tokens, start):
+    result = [ ]
+    for tok in tokens:
+        ntok = tok.copy()
+        ntok.tokId = tok.tokId - start
+        if tok.headId != None and tok.headId != 0:
+            ntok.headId = tok.headId - start if 0 < tok.headId - start <= len(tokens) else None
+        result.append(ntok)
+    return result
+
+def stitchTrees(trees):
+    """Joins the trees of consecutive windows into one tree.
+
+    The first root of the first window stays the root, all the other roots
+    (of the first and of the following windows) are attached to it and
+    labeled with REATTACHED_LBL, so the tree has exactly one root."""
+    arcs = [ ]
+    labels = [ ]
+    sentRoot = None
+    for tree in trees:
+        offset = len(arcs)
+        for dId in range(tree.nrOfTokens()):
+            head = tree.getHead(dId)
+            lbl = tree.getLabel(dId)
+            if head != datatypes.Tree.ROOT:
+                arcs.append(head + offset)
+            elif sentRoot == None:
+                sentRoot = dId + offset
+                arcs.append(datatypes.Tree.ROOT)
+            else:
+                arcs.append(sentRoot)
+                lbl = REATTACHED_LBL if lbl != None else None
+            labels.append(lbl)
+
+    return datatypes.Tree(arcs, labels if any(lbl != None for lbl in labels) else None)
+
+class SegmentingWriter(object):
+    """Splits overlong sentences into windows and joins the trees of the windows before writing.
+
+    The windows are given by 'windows' and their trees have to be processed
+    in the same order. The nr of windows of a split sentence is passed to the
+    writer as the 'imsnpars_windows' metadata (as in configure.parse)."""
+
+    def __init__(self, writer, maxLength):
+        self.__logger = logging.getLogger(self.__class__.__name__)
+        self.__writer = writer
+        self.__maxLength = maxLength
+
+        # sentences waiting for their windows: (sentence, nr of windows)
+        self.__pending = deque()
+        self.__trees = [ ]
+
+        self.__sentences = 0
+        self.__segmented = 0
+
+    def windows(self, sentences):
+        for sent in sentences:
+            sentWindows = splitSentence(sent, self.__maxLength)
+            self.__pending.append((sent, len(sentWindows)))
+            for window in sentWindows:
+                yield window
+
+    def processTree(self, window, tree):
+        self.__trees.append(tree)
+
+        sent, nrOfWindows = self.__pending[0]
+        if len(self.__trees) < nrOfWindows:
+            return
+
+        self.__pending.popleft()
+        self.__sentences += 1
+        if nrOfWindows > 1:
+            self.__segmented += 1
+            self.__logger.debug("Sentence of %i tokens parsed in %i windows" % (len(sent), nrOfWindows))
+            self.__writer.processTree(sent, stitchTrees(self.__trees), { "imsnpars_windows" : str(nrOfWindows) })
+        else:
+            self.__writer.processTree(sent, self.__trees[0])
+
+        self.__trees = [ ]
+
+    def logStats(self):
+        self.__logger.info("Sentences longer than %i tokens parsed in windows: %i of %i" % (self.__maxLength, self.__segmented, self.__sentences))
@@ -8,8 +8,10 @@ import dynet
 import logging
 import random
 import datetime
+import itertools
 
 from imsnpars.tools import datatypes, utils, evaluator
+from imsnpars.nparser import decoding, segmentation
        
 class NNParserTrainLogger(object):
     """Class cumulates all the logging, tracking, and printing of the parser"""
@@ -25,9 +27,14 @@ class NNParserTrainLogger(object):
         if uas != None and las != None:
             self.__logger.debug("Epoch %i, UAS=%.2f LAS=%.2f" % ( self.epochNr, uas, las))
         
-        trainLAS = self.trainEval.calcLAS()
-        trainUAS = self.trainEval.calcUAS()
-        self.__logger.debug("Epoch %i, Train UAS=%.2f Train LAS=%.2f" % ( self.epochNr, trainUAS, trainLAS))
+        # train trees might be decoded only for some sentences (or none)
+        if self.trainEval.allArcs > 0:
+            trainLAS = self.trainEval.calcLAS()
+            trainUAS = self.trainEval.calcUAS()
+            self.__logger.debug("Epoch %i, Train UAS=%.2f Train LAS=%.2f (on %i sentences)" % ( self.epochNr, trainUAS, trainLAS, self.predictedSentences))
+        
+        epochTime = (datetime.datetime.now() - self.startTime).total_seconds()
+        self.__logger.info("Epoch %i, time: %.2f s" % (self.epochNr, epochTime))
         
         self.__reset()
         self.epochNr += 1
@@ -42,6 +49,7 @@ class NNParserTrainLogger(object):
     def finishSentence(self, sentence, predictedTree, lossesAfterUpdate):
         if predictedTree != None:
             self.trainEval.processTree(sentence, predictedTree)
+            self.predictedSentences += 1
          
         self.seenSentences += 1
         if (self.seenSentences > 1 and self.seenSentences % 100 == 0):
@@ -58,6 +66,8 @@ class NNParserTrainLogger(object):
             self.seenInstances = 0
              
     def __reset(self):
+        self.startTime = datetime.datetime.now()
+        self.predictedSentences = 0
         self.seenSentences = 0
         self.seenInstances = 0
         self.iNrOfUpdates = 0
@@ -85,6 +95,9 @@ class NDependencyParser(object):
         
             # saving labels
             self.__labeler.save(pickleOut)
+            
+            # saving the parser data (e.g., arc filters)
+            self.__parser.save(pickleOut)
         
         # saving parameters
         self.__model.save(filename + ".params")
@@ -96,6 +109,9 @@ class NDependencyParser(object):
         
             # loading labels
             self.__labeler.load(pickleIn)
+            
+            # loading the parser data
+            self.__parser.load(pickleIn)
         
         # loading parameters
         self.__model = dynet.ParameterCollection()
@@ -113,7 +129,7 @@ class NDependencyParser(object):
     def getParsingTask(self):
         return self.__parser
     
-    def continueTraining(self, allSentences, trainManager, epochsDone, devData = None, lossBatchSize=0, predictEvery = 20):
+    def continueTraining(self, allSentences, trainManager, epochsDone, devData = None, lossBatchSize=0, predictEvery = 1):
         if not self.__parser.handlesNonProjectiveTrees():    
             sentences = utils.filterNonProjective(allSentences)
             self.__logger.info("Filtered %i non-projective trees " % (len(allSentences) - len(sentences)))
@@ -122,9 +138,9 @@ class NDependencyParser(object):
         
         # for logging
         trainLogger = NNParserTrainLogger(epochsDone)
-        self.__trainOnSentences(sentences, devData, trainManager, trainLogger, lossBatchSize)
+        self.__trainOnSentences(sentences, devData, trainManager, trainLogger, lossBatchSize, predictEvery)
         
-    def train(self, allSentences, trainManager, devData = None, batchSize=0, predictEvery = 20):
+    def train(self, allSentences, trainManager, devData = None, batchSize=0, predictEvery = 1):
         if not self.__parser.handlesNonProjectiveTrees():    
             sentences = utils.filterNonProjective(allSentences)
             self.__logger.info("Filtered %i non-projective trees " % (len(allSentences) - len(sentences)))
@@ -134,6 +150,7 @@ class NDependencyParser(object):
         # fill all dictionaries
         self.__reprBuilder.readData(sentences)
         self.__labeler.readData(sentences)
+        self.__parser.readData(sentences)
         
         # initialize parameters
         self.__model = dynet.ParameterCollection()
@@ -141,21 +158,103 @@ class NDependencyParser(object):
         
         # for logging
         trainLogger = NNParserTrainLogger()
-        self.__trainOnSentences(sentences, devData, trainManager, trainLogger, batchSize)
+        self.__trainOnSentences(sentences, devData, trainManager, trainLogger, batchSize, predictEvery)
     
     
-    def predict(self, sentences, writer):
+    def predict(self, sentences, writer, decodeWorkers = 0, decodePool = "thread", decodeWindow = 32, maxLength = 0, predictBatch = 0):
         startTime = datetime.datetime.now()
-        for i, sent in enumerate(sentences):
-            self.__renewNetwork()
-            instance = self.__reprBuilder.buildInstance(sent)
-            predictedTree = self.__predict_tree(instance)
-            writer.processTree(sent, predictedTree)
+        
+        # sentences longer than maxLength are parsed in windows
+        if maxLength > 0:
+            segWriter = segmentation.SegmentingWriter(writer, maxLength)
+            sentences, writer = segWriter.windows(sentences), segWriter
+        
+        if decodeWorkers > 0 and self.__parser.supportsPipelinedDecoding():
+            self.__predictPipelined(sentences, writer, decodeWorkers, decodePool, decodeWindow)
+        elif predictBatch > 0 and self.__parser.supportsBatchPrediction():
+            self.__predictBatched(sentences, writer, predictBatch)
+        else:
+            if decodeWorkers > 0:
+                self.__logger.warning("The parser does not support pipelined decoding, predicting sequentially")
+            if predictBatch > 0:
+                self.__logger.warning("The parser does not support batch prediction, predicting sequentially")
+                
+            for i, sent in enumerate(sentences):
+                self.__renewNetwork()
+                instance = self.__reprBuilder.buildInstance(sent)
+                predictedTree = self.__predict_tree(instance)
+                writer.processTree(sent, predictedTree)
+        
+        self.__parser.finishPrediction()
+        if maxLength > 0:
+            segWriter.logStats()
             
         endTime = datetime.datetime.now()
         self.__logger.info("Predict time: %f" % ((endTime - startTime).total_seconds()))
     
-    def __trainOnSentences(self, sentences, devData, trainManager, trainLogger, lossBatchSize):
+    def parseSentence(self, sentence, maxLength = 0):
+        """Parses a single sentence (in windows if longer than maxLength), returns the tree and the nr of windows"""
+        trees = [ ]
+        windows = segmentation.splitSentence(sentence, maxLength)
+        for window in windows:
+            self.__renewNetwork()
+            trees.append(self.__predict_tree(self.__reprBuilder.buildInstance(window)))
+        
+        if len(trees) == 1:
+            return trees[0], 1
+        else:
+            return segmentation.stitchTrees(trees), len(trees)
+    
+    def __predictPipelined(self, sentences, writer, decodeWorkers, decodePool, decodeWindow):
+        # trees are decoded by the pool while the following sentences of the window are scored,
+        # one computation graph per window keeps the outputs needed for labeling
+        pool = decoding.DecodingPool(self.__parser.getMSTAlgorithm(), decodeWorkers, decodePool)
+        sentIter = iter(sentences)
+        try:
+            window = list(itertools.islice(sentIter, decodeWindow))
+            while window:
+                self.__renewNetwork()
+                
+                pending = [ ]
+                for sent in window:
+                    instance = self.__reprBuilder.buildInstance(sent)
+                    vectors = self.__reprBuilder.prepareVectors(instance, isTraining=False)
+                    scores = self.__parser.predictScores(instance, vectors)
+                    pending.append((sent, instance, vectors, scores, pool.submit(scores.scores, scores.candidates)))
+                
+                for sent, instance, vectors, scores, heads in pending:
+                    predictTree = self.__parser.predictFromHeads(instance, vectors, scores, heads.result())
+                    lbls = self.__labeler.predict(instance, predictTree, vectors)
+                    if lbls != None:
+                        predictTree.setLabels(lbls)
+                        
+                    writer.processTree(sent, predictTree)
+                    
+                window = list(itertools.islice(sentIter, decodeWindow))
+        finally:
+            pool.shutdown()
+    
+    def __predictBatched(self, sentences, writer, predictBatch):
+        # the parser advances all the sentences of a batch together, one computation graph per batch
+        sentIter = iter(sentences)
+        batch = list(itertools.islice(sentIter, predictBatch))
+        while batch:
+            self.__renewNetwork()
+            
+            instances = [ self.__reprBuilder.buildInstance(sent) for sent in batch ]
+            vectorsList = [ self.__reprBuilder.prepareVectors(instance, isTraining=False) for instance in instances ]
+            predictTrees = self.__parser.predictBatch(instances, vectorsList)
+            
+            for sent, instance, vectors, predictTree in zip(batch, instances, vectorsList, predictTrees):
+                lbls = self.__labeler.predict(instance, predictTree, vectors)
+                if lbls != None:
+                    predictTree.setLabels(lbls)
+                    
+                writer.processTree(sent, predictTree)
+                
+            batch = list(itertools.islice(sentIter, predictBatch))
+    
+    def __trainOnSentences(self, sentences, devData, trainManager, trainLogger, lossBatchSize, predictEvery):
         # start training
         trainer = self.__trainer(self.__model)
         instances = [ self.__reprBuilder.buildInstance(sent) for sent in sentences ]
@@ -176,7 +275,8 @@ class NDependencyParser(object):
             for iId, instance in enumerate(instances):
                 vectors = self.__reprBuilder.prepareVectors(instance, isTraining=True)
                 
-                predictTrain = True
+                # the (unaugmented) train trees are decoded only for logging
+                predictTrain = predictEvery > 0 and iId % predictEvery == 0
                 try:
                     parsLosses, predictTree = self.__parser.buildLosses(vectors, instance, currentEpoch = trainManager.getCurrectEpoch(), predictTrain = predictTrain)
                     lblLosses, predictLbls = self.__labeler.buildLosses(vectors, instance, currentEpoch = trainManager.getCurrectEpoch(), predictTrain = predictTrain)
@@ -122,5 +122,12 @@ def buildTransParser(opts, dummyBuilder, reprBuilder):
     transNetwork = imsnpars.nparser.network.ParserNetwork(opts.mlpHiddenDim, opts.nonLinFun, featIds)
     featBuilder = imsnpars.nparser.features.FeatReprBuilder(transExtractor, { }, dummyBuilder, transNetwork, opts.parseLayer)
     
-    parsingTask = task.NNTransParsingTask(tsystem, anoracle, transNetwork, featBuilder)
+    # static oracles give the same transitions in every epoch
+    if opts.cacheGold and not anoracle.handlesExploration():
+        goldCache = oracle.GoldTransitionCache(tsystem, anoracle)
+    else:
+        goldCache = None
+    
+    parsingTask = task.NNTransParsingTask(tsystem, anoracle, transNetwork, featBuilder, opts.precompute, goldCache, opts.goldCacheFile,
+                                          factorizedLbls = opts.labeler == "trans" and opts.lblScoring == "factorized")
     return parsingTask
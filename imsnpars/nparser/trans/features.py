@@ -6,6 +6,8 @@ Created on 23.08.2017
 
 from enum import IntEnum
 
+import numpy as np
+
 class FeatId(IntEnum):
     S0 = 1
     S1 = 2
@@ -171,11 +173,113 @@ class StateFeatExtractor(object):
         return str(self.__featId)
         
     
+# how every feature is computed: (operation, argument)
+# stack/buffer: n-th element, lmc/rmc/lmc2/rmc2: child of another feature,
+# *_or_self: the feature itself if it has no such child
+FEAT_DEFINITIONS = { FeatId.S0 : ("stack", 0),
+                     FeatId.S1 : ("stack", 1),
+                     FeatId.S2 : ("stack", 2),
+                     FeatId.B0 : ("buffer", 0),
+                     FeatId.B1 : ("buffer", 1),
+                     FeatId.B2 : ("buffer", 2),
+                     FeatId.S0LMC : ("lmc_or_self", FeatId.S0),
+                     FeatId.S0RMC : ("rmc_or_self", FeatId.S0),
+                     FeatId.S1LMC : ("lmc_or_self", FeatId.S1),
+                     FeatId.S1RMC : ("rmc_or_self", FeatId.S1),
+                     FeatId.S2LMC : ("lmc_or_self", FeatId.S2),
+                     FeatId.S2RMC : ("rmc_or_self", FeatId.S2),
+                     FeatId.B0LMC : ("lmc_or_self", FeatId.B0),
+                     FeatId.B0RMC : ("rmc_or_self", FeatId.B0),
+                     FeatId.S0LMC_2 : ("lmc2", FeatId.S0),
+                     FeatId.S0RMC_2 : ("rmc2", FeatId.S0),
+                     FeatId.S0LMC_LMC : ("lmc", FeatId.S0LMC),
+                     FeatId.S0RMC_RMC : ("rmc", FeatId.S0RMC),
+                     FeatId.S1LMC_LMC : ("lmc", FeatId.S1LMC),
+                     FeatId.S1RMC_RMC : ("rmc", FeatId.S1RMC) }
+
+def _stackStep(n):
+    def step(state, _):
+        stack = state.stack
+        return stack.items[stack.size - n - 1] if stack.size > n else None
+    return step
+
+def _bufferStep(n):
+    def step(state, _):
+        buff = state.buffer
+        return buff.items[buff.front + n] if buff.end - buff.front > n else None
+    return step
+
+def _childStep(childArray, slot, orSelf):
+    def step(state, values):
+        head = values[slot]
+        if head is None:
+            return None
+        
+        child = getattr(state.arcs, childArray)[head]
+        if child is None and orSelf:
+            return head
+        return child
+    return step
+
+class CompiledFeatExtractor(object):
+    """Extracts all the configured features of a state in one pass.
+    
+    The features are compiled into a list of steps, every feature (also
+    the ones only needed by others, e.g. s0lmc for s0lmc_lmc) is computed only
+    once per state."""
+    
+    # position of a missing feature in 'extractPositions' (root is -1)
+    NONE = -2
+    
+    def __init__(self, featIds):
+        self.__featIds = list(featIds)
+        
+        # featId -> slot in the values
+        self.__slots = { }
+        self.__steps = [ ]
+        for featId in self.__featIds:
+            self.__compile(featId)
+            
+        self.__outSlots = [ self.__slots[featId] for featId in self.__featIds ]
+        
+    def getFeatIds(self):
+        return self.__featIds
+        
+    def extractValues(self, state):
+        """Returns the positions of all the features (None if missing), in the order of 'featIds'"""
+        values = [ ]
+        for step in self.__steps:
+            values.append(step(state, values))
+        
+        return [ values[slot] for slot in self.__outSlots ]
+    
+    def extractPositions(self, state):
+        """Returns the positions of all the features as an int array, NONE marks the missing ones"""
+        return np.array([ self.NONE if pos is None else pos for pos in self.extractValues(state) ], dtype=np.int64)
+        
+    def __compile(self, featId):
+        if featId in self.__slots:
+            return self.__slots[featId]
+        
+        (op, arg) = FEAT_DEFINITIONS[featId]
+        if op == "stack":
+            step = _stackStep(arg)
+        elif op == "buffer":
+            step = _bufferStep(arg)
+        else:
+            argSlot = self.__compile(arg)
+            step = _childStep(op.replace("_or_self", ""), argSlot, op.endswith("_or_self"))
+        
+        self.__slots[featId] = len(self.__steps)
+        self.__steps.append(step)
+        return self.__slots[featId]
+    
 class TransFeatureExtractor(object):
     
     def __init__(self, stateExtractors):
         assert type(stateExtractors) == type([])
         self.__stateExtractors = stateExtractors
+        self.__compiled = CompiledFeatExtractor(self.getFeatIds())
     
     def getNrOfFeaturs(self):
         return len(self.__stateExtractors)
@@ -184,6 +288,9 @@ class TransFeatureExtractor(object):
         return [ feat.getFeatId() for feat in self.__stateExtractors ]
     
     def extractAllFeatures(self, state):
-        return [ ( feat.getFeatId(), feat.extractFeatures(state)) for feat in self.__stateExtractors ]
+        return list(zip(self.__compiled.getFeatIds(), self.__compiled.extractValues(state)))
+    
+    def extractAllPositions(self, state):
+        """Returns the positions of all the features as an int array (see CompiledFeatExtractor)"""
+        return self.__compiled.extractPositions(state)
     
-    
\ No newline at end of file
@@ -5,6 +5,7 @@ Created on 25.08.2017
 '''
 
 import logging, pickle
+import numpy as np
 
 from imsnpars.nparser.trans.tsystem import tdatatypes
 
@@ -16,6 +17,14 @@ class TransSystemLabeler(tdatatypes.TransSystem):
         self.__system = system
         self.__idToSysTrans = None
         self.__sysTransToId = None
+        
+        # labeled transition id -> system transition id, label id
+        self.__lblToSysTrans = None
+        self.__lblToLblId = None
+        
+        # (system transition id, label id) -> labeled transition id (label id 0 for non-arc transitions)
+        self.__sysLblToTrans = None
+        self.__isArcTrans = None
     
     # trans system functions
     
@@ -45,6 +54,13 @@ class TransSystemLabeler(tdatatypes.TransSystem):
         transId, _ = self.__idToSysTrans[tId]
         return self.__system.isValidTransition(state, transId)
     
+    def validMask(self, state):
+        return self.__system.validMask(state)[self.__lblToSysTrans]
+    
+    def validSysMask(self, state):
+        """Same as validMask, but for the (unlabeled) system transitions"""
+        return self.__system.validMask(state)
+    
     def isCorrectTransition(self, state, tree, tId):
         transId, lbl = self.__idToSysTrans[tId]
         if not self.__system.isCorrectTransition(state, tree, transId):
@@ -73,6 +89,7 @@ class TransSystemLabeler(tdatatypes.TransSystem):
          
     def load(self, pickleIn):
         (self.__idToSysTrans, self.__sysTransToId) = pickle.load(pickleIn)
+        self.__buildIndices()
 
     def getLblTrans(self, sysTrans, lbl = None):
         return self.__sysTransToId[(sysTrans, lbl)]
@@ -81,6 +98,26 @@ class TransSystemLabeler(tdatatypes.TransSystem):
         transId, _ = self.__idToSysTrans[lblTrans]
         return transId
         
+    def getNrOfSysTransitions(self):
+        return self.__system.getNrOfTransitions()
+    
+    def getNrOfLabels(self):
+        return self.__sysLblToTrans.shape[1]
+    
+    def isArcTransition(self, sysTrans):
+        return self.__isArcTrans[sysTrans]
+    
+    def getLblId(self, lblTrans):
+        """Returns the id of the label of a labeled transition (None for non-arc transitions)"""
+        lblId = self.__lblToLblId[lblTrans]
+        return int(lblId) if lblId >= 0 else None
+    
+    def getLblTransById(self, sysTrans, lblId = None):
+        return int(self.__sysLblToTrans[sysTrans, lblId if lblId != None else 0])
+    
+    def getTransitionNames(self):
+        return [ self.__idToSysTrans[tId] for tId in range(len(self.__idToSysTrans)) ]
+        
     def getAllLblTrans(self, sysTrans):
         result = [ ]
         for (sTrans, _), lblTrans in self.__sysTransToId.items():
@@ -103,6 +140,29 @@ class TransSystemLabeler(tdatatypes.TransSystem):
                 transId = len(self.__sysTransToId)
                 self.__sysTransToId[(trans, lbl)] = transId
                 self.__idToSysTrans[transId] = (trans, lbl)
+        
+        self.__buildIndices()
+        
+    def __buildIndices(self):
+        nrOfTrans = len(self.__idToSysTrans)
+        
+        # label ids follow the order of the labeled transitions, so they are the same after loading
+        lblIds = { }
+        for tId in range(nrOfTrans):
+            lbl = self.__idToSysTrans[tId][1]
+            if lbl != None and lbl not in lblIds:
+                lblIds[lbl] = len(lblIds)
+        
+        self.__lblToSysTrans = np.array([ self.__idToSysTrans[tId][0] for tId in range(nrOfTrans) ], dtype=np.int64)
+        self.__lblToLblId = np.array([ lblIds.get(self.__idToSysTrans[tId][1], -1) for tId in range(nrOfTrans) ], dtype=np.int64)
+        
+        self.__isArcTrans = np.zeros(self.__system.getNrOfTransitions(), dtype=bool)
+        self.__isArcTrans[self.__system._getArcTransitions()] = True
+        
+        self.__sysLblToTrans = np.full((self.__system.getNrOfTransitions(), max(len(lblIds), 1)), -1, dtype=np.int64)
+        for tId in range(nrOfTrans):
+            sysTrans, lbl = self.__idToSysTrans[tId]
+            self.__sysLblToTrans[sysTrans, lblIds[lbl] if lbl != None else 0] = tId
                 
     # functions for labeler
     def _buildArc(self, tId, state):
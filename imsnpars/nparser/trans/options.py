@@ -13,7 +13,13 @@ def addParserCmdArguments(argParser):
     transArgs.add_argument("--system", help="transition system", choices=[ "ArcHybrid", "ArcStandard", "ASSwap", "ArcHybridWithSwap" ], required=False, default="ASSwap")
     transArgs.add_argument("--oracle", help="oracle algorithm", choices=[ "static", "dynamic", "lazy", "eager" ], required=False, default="lazy")
     transArgs.add_argument("--features", help="transition-based features", required=False, default="s0,s1,b0")
+    transArgs.add_argument("--lblScoring", help="with the trans labeler: score every labeled transition (joint) or the unlabeled transitions and, only for arc transitions, the labels with a second output layer (factorized)", choices=[ "joint", "factorized" ], required=False, default="joint")
+    transArgs.add_argument("--precompute", help="project all the tokens with the hidden layer of every feature once per sentence, a parser step only sums the precomputed columns", choices=[ "True", "False" ], required=False, default="False")
                 
+    # options for static oracles
+    transArgs.add_argument("--cacheGold", help="compute the gold transitions of static oracles only once and replay them in every epoch", choices=[ "True", "False" ], required=False, default="True")
+    transArgs.add_argument("--goldCacheFile", help="file keeping the gold transitions between runs (e.g., next to the training file)", required=False, default=None)
+    
     # options for dynamic oracle
     transArgs.add_argument("--aggresive", help="aggresive exploration for the dynamic oracle", choices=[ "True", "False" ], required=False, default="True")
 
@@ -21,8 +27,12 @@ def fillParserOptions(args, opts):
     # transition system
     opts.system = args.system
     opts.features = args.features.split(",")
+    opts.lblScoring = args.lblScoring
+    opts.precompute = utils.parseBoolean(args.precompute)
             
     # oracle
+    opts.cacheGold = utils.parseBoolean(args.cacheGold)
+    opts.goldCacheFile = args.goldCacheFile
     opts.pagg = 0.1
     opts.oracle = args.oracle
     opts.aggresive = utils.parseBoolean(args.aggresive)
@@ -5,28 +5,49 @@ Created on 23.08.2017
 '''
 
 import dynet
+import logging
 import numpy as np
 
 import imsnpars.nparser.features
-from imsnpars.tools import utils
+from imsnpars.tools import datatypes
 from imsnpars.tools.neural import NNTreeTask
     
 class NNTransParsingTask(NNTreeTask):
-    def __init__(self, tsystem, anoracle, network, featReprBuilder):
+    def __init__(self, tsystem, anoracle, network, featReprBuilder, precompute = False, goldCache = None, goldCacheFile = None, factorizedLbls = False):
+        self.__logger = logging.getLogger(self.__class__.__name__)
         self.__oracle = anoracle
         self.__tsystem = tsystem
         self.__network = network
         self.__featReprBuilder = featReprBuilder
         
+        # project all the tokens with the hidden layers once per sentence,
+        # every step is then only a sum of the columns of its features
+        self.__precompute = precompute
+        
+        # gold transitions of static oracles are computed once and replayed in every epoch
+        self.__goldCache = goldCache
+        self.__goldCacheFile = goldCacheFile
+        
+        # with the trans labeler: score the system transitions and then (only for arcs)
+        # the labels with the secondary output layer, instead of every labeled transition
+        self.__factorizedLbls = factorizedLbls
+        
     def initializeParameters(self, model, reprDim):
         self.__featReprBuilder.initializeParameters(model, reprDim)
-        self.__network.initializeParameters(model, reprDim, self.__tsystem.getNrOfTransitions())
+        if self.__factorizedLbls:
+            self.__network.initializeParameters(model, reprDim, self.__tsystem.getNrOfSysTransitions(), self.__tsystem.getNrOfLabels())
+        else:
+            self.__network.initializeParameters(model, reprDim, self.__tsystem.getNrOfTransitions())
              
     def getTransLabeler(self):
         return self.__tsystem
     
     def renewNetwork(self):
         self.__network.renewNetwork()
+        
+    def readData(self, sentences):
+        if self.__goldCache != None:
+            self.__goldCache.readData([ datatypes.sentence2Tree(sent) for sent in sentences ], self.__goldCacheFile)
                            
     def handlesNonProjectiveTrees(self):
         return self.__oracle.handlesNonProjectiveTrees()
@@ -37,37 +58,30 @@ class NNTransParsingTask(NNTreeTask):
         state = self.__tsystem.initialState(len(instance.sentence))
         
         cache = imsnpars.nparser.features.FeatOutputCache()
+        featMatrix = self.__buildFeatMatrix(vectors, isTraining=True)
+        goldTransitions = self.__goldCache.getTransitions(instance.correctTree) if self.__goldCache != None else None
+        step = 0
         while not self.__tsystem.isFinal(state):
-            featReprs = self.__featReprBuilder.extractAllAndBuildFeatRepr(state, cache, vectors, isTraining=True)
-            netOut = self.__network.buildOutput(dynet.esum(featReprs), isTraining=True)
-            correctIds = self.__oracle.nextCorrectTransitions(state, instance.correctTree)
-            
-            # filters
-            isValid = lambda x : self.__tsystem.isValidTransition(state, x)
-            isCorrect = lambda x : x in correctIds
+            featRepr = self.__buildFeatRepr(state, cache, featMatrix, vectors, isTraining=True)
+            if goldTransitions is None:
+                correctIds = self.__oracle.nextCorrectTransitions(state, instance.correctTree)
+            elif step < len(goldTransitions):
+                correctIds = [ int(goldTransitions[step]) ]
+            else:
+                raise RuntimeError("No correct transition in state: %s" % str(state))
+            step += 1
             
-            netVal = netOut.value()
-            scoredTransIds = np.argsort(netVal)[::-1]
+            if self.__factorizedLbls:
+                losses, nextTransition = self.__buildFactorizedStepLosses(state, featRepr, correctIds, currentEpoch)
+            else:
+                losses, nextTransition = self.__buildStepLosses(state, featRepr, correctIds, currentEpoch)
             
-            predictedId = utils.first(lambda x : not isCorrect(x) and isValid(x), scoredTransIds)
-            correctId = utils.first(isCorrect, scoredTransIds)
-                
-            correctVal = netVal[correctId]
-            predictedVal = netVal[predictedId] if predictedId != None else -np.inf
-            
-            nextTransition = correctId
-            if predictedId != None:
-                mainLoss = self.__network.buildLoss(netOut, correctId, predictedId)
-                result.append(mainLoss)
-                
-                if self.__oracle.handlesExploration() and self.__oracle.doExploration(correctVal, predictedVal, currentEpoch):
-                    nextTransition = predictedId
-
+            result.extend(losses)
             self.__tsystem.applyTransition(state, nextTransition)
             
         if predictTrain:
             predState = self.__tsystem.initialState(len(instance.sentence))
-            self.__continueUntilFinal(vectors, predState, cache)
+            self.__continueUntilFinal(vectors, predState, cache, featMatrix)
             predictedTree = predState.arcs.buildTree()
         else:
             predictedTree = None
@@ -78,21 +92,182 @@ class NNTransParsingTask(NNTreeTask):
         state = self.__tsystem.initialState(len(instance.sentence))
         
         cache = imsnpars.nparser.features.FeatOutputCache()
-        self.__continueUntilFinal(vectors, state, cache)
+        self.__continueUntilFinal(vectors, state, cache, self.__buildFeatMatrix(vectors, isTraining=False))
         return state.arcs.buildTree()
     
-    def __continueUntilFinal(self, vectors, state, cache):
+    def supportsBatchPrediction(self):
+        return True
+    
+    def predictBatch(self, instances, vectorsList):
+        """Parses the sentences in lockstep: every step scores the states of all the unfinished sentences with one MLP evaluation"""
+        states = [ self.__tsystem.initialState(len(instance.sentence)) for instance in instances ]
+        caches = [ imsnpars.nparser.features.FeatOutputCache() for _ in instances ]
+        featValues = [ ]
+        for vectors in vectorsList:
+            featMatrix = self.__buildFeatMatrix(vectors, isTraining=False)
+            featValues.append(featMatrix.npvalue() if featMatrix is not None else None)
+        
+        active = [ sId for sId, state in enumerate(states) if not self.__tsystem.isFinal(state) ]
+        while active:
+            self.__predictStep([ (states[sId], caches[sId], featValues[sId], vectorsList[sId]) for sId in active ])
+                
+            # finished sentences retire from the batch
+            active = [ sId for sId in active if not self.__tsystem.isFinal(states[sId]) ]
+        
+        return [ state.arcs.buildTree() for state in states ]
+    
+    def __buildFeatMatrix(self, vectors, isTraining):
+        if not self.__precompute:
+            return None
+        
+        return self.__featReprBuilder.buildAllPositionsFeatRepr(vectors, isTraining)
+    
+    def __buildFeatRepr(self, state, cache, featMatrix, vectors, isTraining):
+        if featMatrix is None:
+            return dynet.esum(self.__featReprBuilder.extractAllAndBuildFeatRepr(state, cache, vectors, isTraining))
+        
+        return dynet.sum_dim(dynet.select_cols(featMatrix, self.__getColumns(state).tolist()), [ 1 ])
+    
+    def __buildStepLosses(self, state, featRepr, correctIds, currentEpoch):
+        """Returns the losses of one parser step and the transition to follow"""
+        netOut = self.__network.buildOutput(featRepr, isTraining=True)
+        
+        # filters
+        isCorrect = np.zeros(self.__tsystem.getNrOfTransitions(), dtype=bool)
+        isCorrect[[ tId for tId in correctIds if tId != None ]] = True
+        
+        netVal = netOut.value()
+        predictedId = self.__findBest(netVal, self.__tsystem.validMask(state) & ~isCorrect)
+        correctId = self.__findBest(netVal, isCorrect)
+            
+        correctVal = netVal[correctId]
+        predictedVal = netVal[predictedId] if predictedId != None else -np.inf
+        
+        losses = [ ]
+        nextTransition = correctId
+        if predictedId != None:
+            losses.append(self.__network.buildLoss(netOut, correctId, predictedId))
+            
+            if self.__oracle.handlesExploration() and self.__oracle.doExploration(correctVal, predictedVal, currentEpoch):
+                nextTransition = predictedId
+                
+        return losses, nextTransition
+    
+    def __buildFactorizedStepLosses(self, state, featRepr, correctIds, currentEpoch):
+        """Same as __buildStepLosses, but the system transitions and the labels are scored by separate output layers"""
+        labeler = self.__tsystem
+        netOut = self.__network.buildOutput(featRepr, isTraining=True)
+        correctIds = [ tId for tId in correctIds if tId != None ]
+        
+        isCorrect = np.zeros(labeler.getNrOfSysTransitions(), dtype=bool)
+        isCorrect[[ labeler.getSysTrans(tId) for tId in correctIds ]] = True
+        
+        netVal = netOut.value()
+        predictedId = self.__findBest(netVal, labeler.validSysMask(state) & ~isCorrect)
+        correctId = self.__findBest(netVal, isCorrect)
+        if correctId == None:
+            raise RuntimeError("No correct transition in state: %s" % str(state))
+        
+        losses = [ ]
+        nextTransition = correctId
+        if predictedId != None:
+            losses.append(self.__network.buildLoss(netOut, correctId, predictedId))
+            
+            if self.__oracle.handlesExploration() and self.__oracle.doExploration(netVal[correctId], netVal[predictedId], currentEpoch):
+                nextTransition = predictedId
+        
+        # labels of the correct arc transition
+        lblVal = None
+        if labeler.isArcTransition(correctId):
+            lblOut = self.__network.buildSecondaryOutput(featRepr, isTraining=True)
+            lblVal = lblOut.value()
+            
+            isCorrectLbl = np.zeros(labeler.getNrOfLabels(), dtype=bool)
+            isCorrectLbl[[ labeler.getLblId(tId) for tId in correctIds if labeler.getSysTrans(tId) == correctId ]] = True
+            predictedLbl = self.__findBest(lblVal, ~isCorrectLbl)
+            correctLbl = self.__findBest(lblVal, isCorrectLbl)
+            if predictedLbl != None:
+                losses.append(self.__network.buildLoss(lblOut, correctLbl, predictedLbl))
+        
+        if not labeler.isArcTransition(nextTransition):
+            return losses, labeler.getLblTransById(nextTransition)
+        elif nextTransition == correctId:
+            return losses, labeler.getLblTransById(nextTransition, correctLbl)
+        
+        # an explored arc transition gets its best scored label
+        if lblVal is None:
+            lblVal = self.__network.buildSecondaryOutput(featRepr, isTraining=True).value()
+        return losses, labeler.getLblTransById(nextTransition, int(np.argmax(lblVal)))
+    
+    def __getColumns(self, state):
+        return self.__featReprBuilder.getPositionColumns(self.__featReprBuilder.extractAllPositions(state), state.nrOfTokens)
+    
+    def __continueUntilFinal(self, vectors, state, cache, featMatrix):
+        featValues = featMatrix.npvalue() if featMatrix is not None else None
         while not self.__tsystem.isFinal(state):
-            featReprs = self.__featReprBuilder.extractAllAndBuildFeatRepr(state, cache, vectors, isTraining=False)
-            netOut = self.__network.buildOutput(dynet.esum(featReprs), isTraining=False)
+            self.__predictStep([ (state, cache, featValues, vectors) ])
             
-            scoredTransIds = np.argsort(netOut.value())[::-1]
-            bestTransId = utils.first(lambda x : self.__tsystem.isValidTransition(state, x), scoredTransIds)
+    def __predictStep(self, batch):
+        """Applies the best valid transition to every (state, cache, featValues, vectors), all the states are scored together"""
+        inputs = self.__buildInputs(batch)
+        netVals = self.__evaluateOutputs(inputs, len(batch))
+        
+        transIds = [ ]
+        for col, (state, _, _, _) in enumerate(batch):
+            validMask = self.__tsystem.validSysMask(state) if self.__factorizedLbls else self.__tsystem.validMask(state)
+            bestTransId = self.__findBest(netVals[:, col], validMask)
             
             if bestTransId == None:
                 msg = "No valid transition in state: %s" % str(state)
                 self.__logger.error(msg)
                 raise RuntimeError(msg)
             
-            self.__tsystem.applyTransition(state, bestTransId)
-    
\ No newline at end of file
+            transIds.append(bestTransId)
+        
+        if self.__factorizedLbls:
+            transIds = self.__labelTransitions(inputs, transIds)
+        
+        for (state, _, _, _), transId in zip(batch, transIds):
+            self.__tsystem.applyTransition(state, transId)
+            
+    def __labelTransitions(self, inputs, sysTransIds):
+        """Turns the system transitions into the labeled ones, labels are scored only for the arc transitions"""
+        arcCols = [ col for col, tId in enumerate(sysTransIds) if self.__tsystem.isArcTransition(tId) ]
+        lblIds = [ None ] * len(sysTransIds)
+        if arcCols:
+            arcInputs = inputs[:, arcCols] if self.__precompute else dynet.select_cols(inputs, arcCols)
+            lblVals = self.__evaluateOutputs(arcInputs, len(arcCols), secondary = True)
+            for lblCol, col in enumerate(arcCols):
+                lblIds[col] = int(np.argmax(lblVals[:, lblCol]))
+        
+        return [ self.__tsystem.getLblTransById(tId, lblId) for tId, lblId in zip(sysTransIds, lblIds) ]
+    
+    def __buildInputs(self, batch):
+        """Summed feature representations of many (state, cache, featValues, vectors), one column per state.
+        
+        With precomputed projections it is a numpy matrix (a gather and a sum), otherwise a dynet matrix."""
+        if self.__precompute:
+            return np.stack([ featValues[:, self.__getColumns(state)].sum(axis=1) for state, _, featValues, _ in batch ], axis=1)
+        
+        featReprs = [ dynet.esum(self.__featReprBuilder.extractAllAndBuildFeatRepr(state, cache, vectors, isTraining=False)) for state, cache, _, vectors in batch ]
+        return dynet.concatenate_cols(featReprs)
+    
+    def __evaluateOutputs(self, inputs, nrOfCols, secondary = False):
+        """Scores the inputs of __buildInputs, returns one column of (numpy) scores per input"""
+        if self.__precompute and secondary:
+            return self.__network.evaluateSecondaryOutputs(inputs)
+        elif self.__precompute:
+            return self.__network.evaluateOutputs(inputs)
+        
+        if secondary:
+            netOut = self.__network.buildSecondaryOutputs(inputs, isTraining=False)
+        else:
+            netOut = self.__network.buildOutputs(inputs, isTraining=False)
+        return np.reshape(netOut.npvalue(), (-1, nrOfCols))
+    
+    def __findBest(self, netVal, mask):
+        """Returns the best scored transition allowed by the mask (None if there is none)"""
+        if not mask.any():
+            return None
+        
+        return int(np.argmax(np.where(mask, netVal, -np.inf)))
@@ -5,6 +5,7 @@ Created on 18.08.2017
 '''
 
 import logging
+import numpy as np
 
 from imsnpars.nparser.trans.tsystem import tdatatypes
 from imsnpars.nparser.trans.tsystem import oracle
@@ -115,6 +116,9 @@ class ArcHybridWithSwap(tdatatypes.TransSystem):
     __LEFTARC = LeftArc()
     __RIGHTARC = RightArc()
     __SWAP = Swap()
+    
+    # ordered by the transition ids
+    __TRANSITIONS = (__SHIFT, __LEFTARC, __RIGHTARC, __SWAP)
      
     def applyTransition(self, state, tId):
         self.__getTransition(tId).update(state)
@@ -125,6 +129,9 @@ class ArcHybridWithSwap(tdatatypes.TransSystem):
     def isValidTransition(self, state, tId):
         return self.__getTransition(tId).isValid(state)
     
+    def validMask(self, state):
+        return np.array([ trans.isValid(state) for trans in self.__TRANSITIONS ], dtype=bool)
+    
     def isFinal(self, state):
         return state.stack.empty() and state.buffer.length() == 1 and state.buffer.head() == tdatatypes.State.ROOT
     
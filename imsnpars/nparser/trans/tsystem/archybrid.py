@@ -89,6 +89,9 @@ class ArcHybrid(tdatatypes.TransSystem):
     __LEFTARC = LeftArc()
     __RIGHTARC = RightArc()
     
+    # ordered by the transition ids
+    __TRANSITIONS = (__SHIFT, __LEFTARC, __RIGHTARC)
+    
     def applyTransition(self, state, tId):
         self.__getTransition(tId).update(state)
     
@@ -97,6 +100,9 @@ class ArcHybrid(tdatatypes.TransSystem):
     
     def isValidTransition(self, state, tId):
         return self.__getTransition(tId).isValid(state)
+    
+    def validMask(self, state):
+        return np.array([ trans.isValid(state) for trans in self.__TRANSITIONS ], dtype=bool)
 
     def isFinal(self, state):
         return state.buffer.empty() and state.stack.length() == 1
@@ -175,10 +181,29 @@ class ArcHybridStaticOracle(oracle.Oracle):
                 return self.__labeler.getLblTrans(tId, lbl)
             
 class ArcHybridDynamicOracle(oracle.Oracle):
+    """Dynamic oracle for ArcHybrid (Goldberg and Nivre, 2013).
+    
+    In ArcHybrid the buffer is always the range of tokens from its front to
+    the end and the stack holds the root and all the tokens left of the buffer
+    without a head. The costs only need, for every head, the nr of its gold
+    children in the buffer and on the stack. These counters are kept for the
+    last state the oracle was asked about and updated by one transition at a
+    time while the same state is followed, otherwise they are recomputed."""
+    
     def __init__(self, system, labeler, policy):
         self.__system = system
         self.__labeler = labeler
         self.__policy = policy
+        
+        # counters of the followed state
+        self.__state = None
+        self.__tree = None
+        self.__goldHeads = None
+        self.__bufferChildren = None
+        self.__stackChildren = None
+        
+        # (nr of transitions, buffer front, s0, b0) when the counters were updated
+        self.__last = None
 
     def handlesNonProjectiveTrees(self):
         return False
@@ -190,6 +215,8 @@ class ArcHybridDynamicOracle(oracle.Oracle):
         return not self.__policy.doCorrect(correctVal, predictedVal, epoch)
     
     def nextCorrectTransitions(self, state, tree):
+        self.__updateCounters(state, tree)
+        
         leftCost = self._calculateLeftCost(state, tree)
         rightCost = self._calculateRightCost(state, tree)
         shiftCost = self._calculateShiftCost(state, tree)
@@ -206,52 +233,89 @@ class ArcHybridDynamicOracle(oracle.Oracle):
             result.append(self.__system.SHIFT)
             
         return self._getLabeledTransitions(state, tree, result)
-            
+    
+    # the costs use the counters updated for the state
+    
     def _calculateLeftCost(self, state, tree):
-        leftCost = 0
-        
         if state.stack.empty() or state.buffer.empty() or state.stack.top() == tdatatypes.State.ROOT:
-            leftCost = np.inf
-        else:
-            # s0 children
-            s0 = state.stack.top()
-            leftCost += sum([ 1 if tree.hasArc(s0, d) else 0 for d in state.buffer ])
-            
-            # s0 head
-            if state.stack.length() > 1:
-                s1 = state.getStackElem(1)
-                leftCost += 1 if tree.hasArc(s1, s0) else 0
-            
-            leftCost += sum([ 1 if tree.hasArc(h, s0) else 0 for h in state.buffer.tail() ])
-            
+            return np.inf
+        
+        s0 = state.stack.top()
+        s0Head = self.__goldHeads[s0]
+        
+        # s0 children in the buffer, s0 head: s1 or in the buffer (but not b0)
+        leftCost = self.__bufferChildren[s0]
+        leftCost += 1 if state.stack.length() > 1 and s0Head == state.getStackElem(1) else 0
+        leftCost += 1 if s0Head > state.buffer.head() else 0
         return leftCost
     
     def _calculateRightCost(self, state, tree):
-        rightCost = 0
-        
         if state.stack.length() < 2 or state.stack.top() == tdatatypes.State.ROOT:
-            rightCost = np.inf
-        else:
-            # s0 children
-            s0 = state.stack.top()
-            rightCost += sum([ 1 if tree.hasArc(s0, d) else 0 for d in state.buffer ])
-            rightCost += sum([ 1 if tree.hasArc(h, s0) else 0 for h in state.buffer ])
-            
+            return np.inf
+        
+        s0 = state.stack.top()
+        
+        # s0 children and head in the buffer
+        rightCost = self.__bufferChildren[s0]
+        rightCost += 1 if not state.buffer.empty() and self.__goldHeads[s0] >= state.buffer.head() else 0
         return rightCost
     
     def _calculateShiftCost(self, state, tree):
-        shiftCost = 0
-        
         if state.buffer.empty():
-            shiftCost = np.inf
-        else:
-            b = state.buffer.head()
-            shiftCost += sum([ 1 if tree.hasArc(b, d) else 0 for d in state.stack ])
-            
-            if not state.stack.empty():
-                shiftCost += sum([ 1 if tree.hasArc(h, b) else 0 for h in state.stack.tail() ])
+            return np.inf
+        
+        b0 = state.buffer.head()
+        b0Head = self.__goldHeads[b0]
+        
+        # b0 children on the stack, b0 head on the stack (but not s0)
+        shiftCost = self.__stackChildren[b0]
+        if not state.stack.empty() and b0Head != state.stack.top() and self.__isOnStack(state, b0Head):
+            shiftCost += 1
         
         return shiftCost
+    
+    def __isOnStack(self, state, tokPos):
+        if tokPos == tdatatypes.State.ROOT:
+            return True
+        
+        return tokPos < state.buffer.head() and not state.arcs.hasHead(tokPos)
+    
+    def __updateCounters(self, state, tree):
+        front = state.buffer.front
+        nrOfTrans = 2 * front + 1 - state.stack.length()
+        
+        if state is not self.__state or tree is not self.__tree or nrOfTrans < self.__last[0] or nrOfTrans > self.__last[0] + 1:
+            self.__initCounters(state, tree)
+        elif nrOfTrans == self.__last[0] + 1:
+            _, lastFront, lastS0, lastB0 = self.__last
+            if front == lastFront + 1:
+                # shift: b0 moved from the buffer to the stack
+                head = self.__goldHeads[lastB0]
+                self.__bufferChildren[head] -= 1
+                self.__stackChildren[head] += 1
+            else:
+                # left or right arc: s0 was reduced
+                self.__stackChildren[self.__goldHeads[lastS0]] -= 1
+        
+        s0 = state.stack.top() if not state.stack.empty() else None
+        b0 = state.buffer.head() if not state.buffer.empty() else None
+        self.__last = (nrOfTrans, front, s0, b0)
+        
+    def __initCounters(self, state, tree):
+        self.__state = state
+        self.__tree = tree
+        self.__goldHeads = tree.toList()
+        
+        # headPos -> nr of gold children (root in the last slot)
+        self.__bufferChildren = [ 0 ] * (state.nrOfTokens + 1)
+        self.__stackChildren = [ 0 ] * (state.nrOfTokens + 1)
+        
+        bufferStart = state.buffer.head() if not state.buffer.empty() else state.nrOfTokens
+        for dep, head in enumerate(self.__goldHeads):
+            if dep >= bufferStart:
+                self.__bufferChildren[head] += 1
+            elif not state.arcs.hasHead(dep):
+                self.__stackChildren[head] += 1
          
     def _getLabeledTransitions(self, state, tree, tIds):
         if self.__labeler == None:
@@ -5,6 +5,7 @@ Created on 18.08.2017
 '''
 
 import logging
+import numpy as np
 
 from imsnpars.nparser.trans.tsystem import tdatatypes
 from imsnpars.nparser.trans.tsystem import oracle
@@ -72,11 +73,17 @@ class ArcStandard(tdatatypes.TransSystem):
     __LEFTARC = LeftArc()
     __RIGHTARC = RightArc()
     
+    # ordered by the transition ids
+    __TRANSITIONS = (__SHIFT, __LEFTARC, __RIGHTARC)
+    
     def applyTransition(self, state, tId):
         self.__getTransition(tId).update(state)
     
     def isValidTransition(self, state, tId):
         return self.__getTransition(tId).isValid(state)
+    
+    def validMask(self, state):
+        return np.array([ trans.isValid(state) for trans in self.__TRANSITIONS ], dtype=bool)
 
     def isFinal(self, state):
         return state.buffer.empty() and state.stack.length() == 1
@@ -5,6 +5,7 @@ Created on 18.08.2017
 '''
 
 import logging
+import numpy as np
 
 from imsnpars.tools import datatypes
 from imsnpars.nparser.trans.tsystem import tdatatypes, arcstandard, oracle
@@ -47,6 +48,9 @@ class ArcStandardWithSwap(tdatatypes.TransSystem):
     __LEFTARC = arcstandard.LeftArc()
     __RIGHTARC = arcstandard.RightArc()
     __SWAP = Swap()
+    
+    # ordered by the transition ids
+    __TRANSITIONS = (__SHIFT, __LEFTARC, __RIGHTARC, __SWAP)
      
     def applyTransition(self, state, tId):
         self.__getTransition(tId).update(state)
@@ -56,6 +60,9 @@ class ArcStandardWithSwap(tdatatypes.TransSystem):
     
     def isValidTransition(self, state, tId):
         return self.__getTransition(tId).isValid(state)
+    
+    def validMask(self, state):
+        return np.array([ trans.isValid(state) for trans in self.__TRANSITIONS ], dtype=bool)
 
     def isFinal(self, state):
         return state.buffer.empty() and state.stack.length() == 1
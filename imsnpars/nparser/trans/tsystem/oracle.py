@@ -4,7 +4,8 @@ Created on 23.08.2017
 @author: falensaa
 '''
 
-import abc, random
+import abc, logging, os, pickle, random
+import numpy as np
 
 class Oracle(object):
     __metaclass__ = abc.ABCMeta
@@ -65,4 +66,67 @@ def buildStaticCorrectTransitions(tree, tsystem, oracle, labeler = None):
     
     return result
 
-                    
\ No newline at end of file
+                    
+
+
+class GoldTransitionCache(object):
+    """Gold transition sequences of the training trees for static oracles.
+    
+    A static oracle gives the same transitions in every epoch, so they are
+    computed once per tree (trees with the same arcs and labels share one
+    sequence) and kept as int arrays. A sequence shorter than needed means that
+    the oracle found no correct transition at that step."""
+    
+    def __init__(self, tsystem, anoracle):
+        self.__logger = logging.getLogger(self.__class__.__name__)
+        self.__tsystem = tsystem
+        self.__oracle = anoracle
+        
+        # (heads, labels) -> transition ids
+        self.__sequences = { }
+        
+    def getTransitions(self, tree):
+        key = self.__getKey(tree)
+        if key not in self.__sequences:
+            transitions = buildStaticCorrectTransitions(tree, self.__tsystem, self.__oracle)
+            self.__sequences[key] = np.array(transitions, dtype=np.int32)
+            
+        return self.__sequences[key]
+    
+    def readData(self, trees, filename = None):
+        """Computes the sequences of all the trees, 'filename' (if given) stores them between runs"""
+        if filename != None and os.path.exists(filename):
+            self.__load(filename)
+        
+        before = len(self.__sequences)
+        for tree in trees:
+            self.getTransitions(tree)
+        added = len(self.__sequences) - before
+        
+        self.__logger.info("Gold transition sequences: %i (%i computed)" % (len(self.__sequences), added))
+        if filename != None and added > 0:
+            self.__save(filename)
+    
+    def __getKey(self, tree):
+        labels = tree.getLabels()
+        return (tuple(tree.toList()), tuple(labels) if labels != None else None)
+    
+    def __save(self, filename):
+        with open(filename, "wb") as pickleOut:
+            pickle.dump((type(self.__oracle).__name__, self.__tsystem.getTransitionNames(), self.__sequences), pickleOut)
+            
+    def __load(self, filename):
+        with open(filename, "rb") as pickleIn:
+            oracleName, transNames, sequences = pickle.load(pickleIn)
+        
+        # transition ids (e.g., of labeled transitions) may differ between runs, they are mapped by their names
+        currentIds = { name : tId for tId, name in enumerate(self.__tsystem.getTransitionNames()) }
+        if oracleName != type(self.__oracle).__name__ or any(name not in currentIds for name in transNames):
+            self.__logger.warning("Gold transitions in %s were built for another setting, ignoring them" % filename)
+            return
+        
+        toCurrent = np.array([ currentIds[name] for name in transNames ], dtype=np.int32)
+        for key, transitions in sequences.items():
+            self.__sequences[key] = toCurrent[transitions]
+            
+        self.__logger.info("Gold transition sequences loaded from %s: %i" % (filename, len(sequences)))
@@ -5,7 +5,6 @@ Created on 18.08.2017
 '''
 
 import abc
-import heapq
 
 from imsnpars.tools import datatypes
 
@@ -50,6 +49,15 @@ class TransSystem:
     def isValidTransition(self, state, transId):
         return
     
+    @abc.abstractmethod
+    def validMask(self, state):
+        """Returns a boolean numpy array, True for every valid transition id"""
+        return
+    
+    def getTransitionNames(self):
+        """Returns picklable descriptions of all the transition ids (the same across runs)"""
+        return list(range(self.getNrOfTransitions()))
+    
     # functions for labeler
     
     @abc.abstractmethod
@@ -67,8 +75,15 @@ class TransSystem:
     
 
 #TODO: convert this into mutable and not mutable
-#TODO: build from simple array
-class TreeUnderConstruction:
+class TreeUnderConstruction(object):
+    """Arcs built so far.
+    
+    For every head the nr of children and the leftmost, rightmost, second
+    leftmost and second rightmost child are kept up to date in 'add', so that
+    the child features are simple lookups. Arrays indexed by head positions
+    have an additional last slot for the root (-1)."""
+    __slots__ = ("arcs", "labels", "nrOfChildren", "lmc", "lmc2", "rmc", "rmc2")
+    
     NO_HEAD = datatypes.Tree.NO_HEAD
     NO_CHILDREN = 0
     
@@ -77,8 +92,23 @@ class TreeUnderConstruction:
         self.arcs = [ TreeUnderConstruction.NO_HEAD ] * (nrOfTokens)
         self.labels = [ None ] * (nrOfTokens)
   
-        # tokenPos -> children
-        self.children = [ [] for _ in range(nrOfTokens + 1) ]
+        # headPos -> nr of children, (second) left/rightmost child
+        self.nrOfChildren = [ TreeUnderConstruction.NO_CHILDREN ] * (nrOfTokens + 1)
+        self.lmc = [ None ] * (nrOfTokens + 1)
+        self.lmc2 = [ None ] * (nrOfTokens + 1)
+        self.rmc = [ None ] * (nrOfTokens + 1)
+        self.rmc2 = [ None ] * (nrOfTokens + 1)
+        
+    def copy(self):
+        result = TreeUnderConstruction.__new__(TreeUnderConstruction)
+        result.arcs = self.arcs[:]
+        result.labels = self.labels[:]
+        result.nrOfChildren = self.nrOfChildren[:]
+        result.lmc = self.lmc[:]
+        result.lmc2 = self.lmc2[:]
+        result.rmc = self.rmc[:]
+        result.rmc2 = self.rmc2[:]
+        return result
 
     def getHead(self, tokPos):
         return self.arcs[tokPos]
@@ -91,7 +121,21 @@ class TreeUnderConstruction:
   
     def add(self, headPos, depPos):
         self.arcs[depPos] = headPos
-        heapq.heappush(self.children[headPos], depPos)
+        self.nrOfChildren[headPos] += 1
+        
+        lmc = self.lmc[headPos]
+        if lmc is None or depPos < lmc:
+            self.lmc2[headPos] = lmc
+            self.lmc[headPos] = depPos
+        elif self.lmc2[headPos] is None or depPos < self.lmc2[headPos]:
+            self.lmc2[headPos] = depPos
+        
+        rmc = self.rmc[headPos]
+        if rmc is None or depPos > rmc:
+            self.rmc2[headPos] = rmc
+            self.rmc[headPos] = depPos
+        elif self.rmc2[headPos] is None or depPos > self.rmc2[headPos]:
+            self.rmc2[headPos] = depPos
   
     def addLabel(self, arc, label):
         self.labels[arc[1]] = label
@@ -104,7 +148,7 @@ class TreeUnderConstruction:
         return self.arcs[depPos] == headPos
   
     def howManyChildren(self, headPos):
-        return len(self.children[headPos])
+        return self.nrOfChildren[headPos]
     
     def __str__(self):
         return str(self.arcs)
@@ -114,65 +158,177 @@ class TreeUnderConstruction:
   
     #TODO:  It does not check exactly the children but should be enough
     def theSameChilden(self, tokenPos, tree):
-        return tree.howManyChildren(tokenPos) == self.howManyChildren(tokenPos) 
+        return tree.howManyChildren(tokenPos) == self.nrOfChildren[tokenPos]
 
     def getLeftChild(self, headPos, pos=0):
-        if pos >= len(self.children[headPos]):
-            return None
-        
-        fromLeft = heapq.nsmallest(pos+1, self.children[headPos])
-        return fromLeft[pos]
+        """Returns the leftmost (pos=0) or the second leftmost (pos=1) child"""
+        if pos == 0:
+            return self.lmc[headPos]
+        elif pos == 1:
+            return self.lmc2[headPos]
+        else:
+            raise RuntimeError("Only the two leftmost children are kept: %i" % pos)
     
     def getRightChild(self, headPos, pos=0):
-        if pos >= len(self.children[headPos]):
-            return None
+        """Returns the rightmost (pos=0) or the second rightmost (pos=1) child"""
+        if pos == 0:
+            return self.rmc[headPos]
+        elif pos == 1:
+            return self.rmc2[headPos]
+        else:
+            raise RuntimeError("Only the two rightmost children are kept: %i" % pos)
+    
+    
+class StateStack(object):
+    """Stack of token positions kept in a fixed-size array, the top is at 'size - 1'"""
+    __slots__ = ("items", "size")
+    
+    def __init__(self, capacity, elems = ()):
+        self.items = [ 0 ] * capacity
+        self.size = len(elems)
+        self.items[:self.size] = elems
         
-        fromRight = heapq.nlargest(pos+1, self.children[headPos])
-        return fromRight[pos]
+    def copy(self):
+        result = StateStack.__new__(StateStack)
+        result.items = self.items[:]
+        result.size = self.size
+        return result
+    
+    def front(self):
+        return self.items[0]
+    
+    def pop(self):
+        self.size -= 1
+        return self.items[self.size]
+    
+    def top(self):
+        return self.items[self.size - 1]
     
-    def getChildren(self, headPos):
-        return self.children[headPos]
+    def tail(self):
+        return self.items[:self.size - 1]
     
+    def push(self, el):
+        self.items[self.size] = el
+        self.size += 1
+        
+    def length(self):
+        return self.size
+    
+    def toList(self):
+        return self.items[:self.size]
+    
+    def empty(self):
+        return self.size == 0
+    
+    def elem(self, pos):
+        return self.items[self.size - pos - 1]
+    
+    def __str__(self):
+        return str(self.toList())
+    
+    def __iter__(self):
+        return iter(self.toList())
+    
+class StateBuffer(object):
+    """Buffer of token positions kept in a fixed-size array between 'front' and 'end'.
+    
+    Elements put back to the buffer (swap) are stored in front of 'front',
+    there is always room for them as the buffer never gets longer than at the
+    beginning."""
+    __slots__ = ("items", "front", "end")
+    
+    def __init__(self, elems):
+        self.items = list(elems)
+        self.front = 0
+        self.end = len(self.items)
+        
+    def copy(self):
+        result = StateBuffer.__new__(StateBuffer)
+        result.items = self.items[:]
+        result.front = self.front
+        result.end = self.end
+        return result
+        
+    def empty(self):
+        return self.front == self.end
+    
+    def length(self):
+        return self.end - self.front
+    
+    def head(self):
+        return self.items[self.front]
+    
+    def tail(self):
+        return self.items[self.front + 1:self.end]
+    
+    def pop(self):
+        self.front += 1
+        return self.items[self.front - 1]
+    
+    def addFront(self, elem):
+        if self.front == 0:
+            raise RuntimeError("No room in front of the buffer")
+        
+        self.front -= 1
+        self.items[self.front] = elem
+        
+    def toList(self):
+        return self.items[self.front:self.end]
+    
+    def elem(self, pos):
+        return self.items[self.front + pos]
+    
+    def __str__(self):
+        return str(self.toList())
+    
+    def __iter__(self):
+        return iter(self.toList())
     
 class State(object):
+    """Parser configuration: stack, buffer and the arcs built so far.
+    
+    'copy' gives an independent state, e.g. for exploration or beam search."""
+    __slots__ = ("nrOfTokens", "stack", "buffer", "arcs")
+    
     ROOT = -1
     
     def __init__(self, nrOfTokens, putRootOnStack = True):
         self.nrOfTokens = nrOfTokens
   
         if putRootOnStack:
-            # only root on the stack 
-            self.stack = datatypes.Stack([ State.ROOT ])
-  
-            # all tokens in the buffer
-            self.buffer = datatypes.Buffer(range(0, nrOfTokens))
+            # only root on the stack, all tokens in the buffer
+            self.stack = StateStack(nrOfTokens + 1, [ State.ROOT ])
+            self.buffer = StateBuffer(range(0, nrOfTokens))
   
         else:
-            # the stack is empty 
-            self.stack = datatypes.Stack([  ])
-  
-            # all tokens in the buffer
-            self.buffer = datatypes.Buffer(range(0, nrOfTokens))
-            
-            # root at the end
-            self.buffer.append(State.ROOT)
+            # the stack is empty, all tokens in the buffer and root at the end
+            self.stack = StateStack(nrOfTokens + 1)
+            self.buffer = StateBuffer(list(range(0, nrOfTokens)) + [ State.ROOT ])
             
         # no arcs
         self.arcs = TreeUnderConstruction(nrOfTokens)
+        
+    def copy(self):
+        result = State.__new__(State)
+        result.nrOfTokens = self.nrOfTokens
+        result.stack = self.stack.copy()
+        result.buffer = self.buffer.copy()
+        result.arcs = self.arcs.copy()
+        return result
 
     def getStackElem(self, n):
         """Returns nth element on the stack"""
-        
-        if self.stack.length() > n:
-            return self.stack.elem(n)
+        stack = self.stack
+        if stack.size > n:
+            return stack.items[stack.size - n - 1]
         else:
             return None
         
     def getBufferElem(self, n):
         """Returns nth element on the buffer"""
-        
-        if self.buffer.length() > n:
-            return self.buffer.elem(n)
+        buff = self.buffer
+        if buff.end - buff.front > n:
+            return buff.items[buff.front + n]
         else:
             return None
         
@@ -180,25 +336,25 @@ class State(object):
         if headPos == None:
             return None
         
-        return self.arcs.getLeftChild(headPos)
+        return self.arcs.lmc[headPos]
     
     def getRightMostChild(self, headPos):
         if headPos == None:
             return None
         
-        return self.arcs.getRightChild(headPos)
+        return self.arcs.rmc[headPos]
     
     def getLeftSecondChild(self, headPos):
         if headPos == None:
             return None
         
-        return self.arcs.getLeftChild(headPos, 1)
+        return self.arcs.lmc2[headPos]
     
     def getRightSecondChild(self, headPos):
         if headPos == None:
             return None
         
-        return self.arcs.getRightChild(headPos, 1)
+        return self.arcs.rmc2[headPos]
     
     def __str__(self):
         return "%s\t%s\t%s" % (self.stack, self.buffer, self.arcs)
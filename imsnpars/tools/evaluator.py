@@ -10,7 +10,7 @@ class LazyTreeEvaluator(object):
         self.correctLblArcs = 0
         self.allArcs = 0
         
-    def processTree(self, sent, tree):
+    def processTree(self, sent, tree, metadata = None):
         for pos, tok in enumerate(sent):
             self.allArcs += 1
             if tok.getHeadPos() == tree.getHead(pos):
@@ -53,4 +53,27 @@ class NNTreeTask(object):
     
     @abc.abstractmethod
     def predict(self, instance, vectors):
-        pass
\ No newline at end of file
+        pass
+    
+    def readData(self, sentences):
+        pass
+    
+    def save(self, pickleOut):
+        pass
+    
+    def load(self, pickleIn):
+        pass
+    
+    def supportsPipelinedDecoding(self):
+        """Whether the trees can be decoded from score matrices (see decoding.DecodingPool).
+        
+        Such tasks implement getMSTAlgorithm, predictScores and predictFromHeads."""
+        return False
+    
+    def supportsBatchPrediction(self):
+        """Whether many sentences can be predicted together (predictBatch(instances, vectorsList) returns their trees)"""
+        return False
+    
+    def finishPrediction(self):
+        """Called after all the sentences were predicted (e.g., to log statistics)"""
+        pass
@@ -198,7 +198,11 @@ class LazySentenceWriter(object):
         self.__f = f
         self.__tokenToStr = tokenToStr
         
-    def processTree(self, sentence, tree):
+    def processTree(self, sentence, tree, metadata = None):
+        """Writes the sentence with the heads and labels of the tree, metadata (if given) as '# key = value' comments"""
+        for key, value in sorted((metadata or { }).items()):
+            self.__f.write("# %s = %s\n" % (key, value))
+            
         for pos, tok in enumerate(sentence):
             ntok = tok.copy()
             ntok.setHeadPos(tree.getHead(pos))
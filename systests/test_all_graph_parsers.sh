@@ -16,7 +16,7 @@ DEVICE="CPU"
 MODEL=$OUT/test_graph.model
 PARSER=$IMSNPARS/imsnpars/main.py
 
-IFS=',' read -a msts <<< "CLE"
+IFS=',' read -a msts <<< "CLE,NCLE,EISNER"
 IFS=',' read -a labelers <<< "graph-mtl,graph,None"
 IFS=',' read -a contexts <<< "bilstm,concat"
 IFS='|' read -a feats <<< "h,d,h+1,d-1,dist|h,d|h,d,dist|h+1,d|h,d+1"
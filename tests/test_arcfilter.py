@@ -0,0 +1,33 @@
+"Tests the POS arc filter."
+
+import io
+
+from imsnpars.tools import utils
+from imsnpars.nparser.graph import arcfilter
+
+
+def sentence(tags, heads):
+    return [ utils.ConLLToken(i + 1, "w", "_", pos, pos, "_", head, "dep", None) for i, (pos, head) in enumerate(zip(tags, heads)) ]
+
+
+class Instance(object):
+    def __init__(self, sent):
+        self.sentence = sent
+
+
+def test_only_seen_arcs_are_allowed():
+    arcFilter = arcfilter.POSArcFilter()
+    arcFilter.readData([ sentence([ "DET", "NOUN", "VERB" ], [ 2, 3, 0 ]) ])
+
+    pickled = io.BytesIO()
+    arcFilter.save(pickled)
+    pickled.seek(0)
+    loaded = arcfilter.POSArcFilter()
+    loaded.load(pickled)
+
+    mask = loaded.findAllowedArcs(Instance(sentence([ "DET", "NOUN", "VERB", "X" ], [ None ] * 4)))
+    assert mask[0, 1:].all()
+    assert mask[2, 1] and mask[3, 2]
+    assert not mask[1, 2] and not mask[2, 3] and not mask[3, 1]
+    # unknown tags are never filtered
+    assert mask[1:4, 4].all() and mask[4, 1:4].all()
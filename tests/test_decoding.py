@@ -0,0 +1,38 @@
+"Tests decoding in worker pools."
+
+import numpy as np
+
+from imsnpars.nparser import decoding
+from imsnpars.nparser.graph.mst import arraycle, benchmark, cle, gdatatypes
+
+
+def test_pool_keeps_the_order():
+    rng = np.random.RandomState(11)
+    mst = arraycle.ArrayChuLiuEdmonds()
+    matrices = [ rng.randn(length, length) for length in range(2, 20) ]
+    expected = [ mst.findMST(weights).tolist() for weights in matrices ]
+
+    for poolType in [ "thread", "process" ]:
+        pool = decoding.DecodingPool(mst, 2, poolType)
+        try:
+            heads = [ pool.submit(weights) for weights in matrices ]
+            assert [ h.result() for h in heads ] == expected
+        finally:
+            pool.shutdown()
+
+
+def test_pool_decodes_on_the_candidate_arcs():
+    rng = np.random.RandomState(13)
+    mst = cle.ChuLiuEdmonds()
+    matrices = [ benchmark.prunedScores(rng, length) for length in range(3, 25) ]
+    masks = [ np.isfinite(weights) for weights in matrices ]
+    expected = [ mst.findMSTHeads(gdatatypes.SquareArrayScores(len(weights), weights, candidates)) for weights, candidates in zip(matrices, masks) ]
+
+    for poolType in [ "thread", "process" ]:
+        pool = decoding.DecodingPool(mst, 2, poolType)
+        try:
+            heads = [ pool.submit(weights, candidates).result() for weights, candidates in zip(matrices, masks) ]
+            assert heads == expected
+            assert all(candidates[h, d] for hs, candidates in zip(heads, masks) for d, h in enumerate(hs) if d > 0)
+        finally:
+            pool.shutdown()
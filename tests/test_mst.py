@@ -0,0 +1,117 @@
+"Tests MST algorithms."
+
+import itertools
+
+import numpy as np
+
+from imsnpars.tools import datatypes
+from imsnpars.nparser.graph.mst import cle, arraycle, eisner, gdatatypes, benchmark
+
+
+def fill_scores(scores, weights):
+    for hId in range(-1, len(weights) - 1):
+        for dId in range(-1, len(weights) - 1):
+            scores.addScore(hId, dId, weights[hId + 1][dId + 1])
+    return scores
+
+
+def test_array_cle_equals_cle():
+    rng = np.random.RandomState(42)
+    mst, arrayMst = cle.ChuLiuEdmonds(), arraycle.ArrayChuLiuEdmonds()
+
+    for length in list(range(2, 30)) * 5:
+        weights = rng.randn(length, length)
+        expected = mst.findMSTHeads(fill_scores(gdatatypes.SquareArrayScores(length), weights))
+        result = arrayMst.findMSTHeads(fill_scores(gdatatypes.SquareArrayScores(length), weights))
+        assert result == expected
+
+
+def test_array_cle_breaks_cycles():
+    # 1 <-> 2 is the best pair of arcs but has to be broken
+    weights = np.array([[0, 1, 0],
+                        [0, 0, 10],
+                        [0, 10, 0]], dtype=float)
+    heads = arraycle.ArrayChuLiuEdmonds().findMST(weights)
+    assert heads.tolist() == [-1, 0, 1]
+
+
+def best_projective_weight(weights):
+    best = -np.inf
+    tokens = range(1, len(weights))
+    for heads in itertools.product(range(len(weights)), repeat=len(weights) - 1):
+        if any(h == d for h, d in zip(heads, tokens)) or not is_tree(heads):
+            continue
+        if datatypes.Tree([ h - 1 for h in heads ]).isProjective():
+            best = max(best, sum(weights[h][d] for h, d in zip(heads, tokens)))
+    return best
+
+
+def is_tree(heads):
+    for d in range(1, len(heads) + 1):
+        seen = set()
+        while d != 0:
+            if d in seen:
+                return False
+            seen.add(d)
+            d = heads[d - 1]
+    return True
+
+
+def test_eisner_finds_best_projective_tree():
+    rng = np.random.RandomState(7)
+    for length in list(range(2, 7)) * 4:
+        weights = rng.randn(length, length)
+        heads = eisner.Eisner().findMST(weights)
+        assert heads[0] == -1 and is_tree(heads[1:])
+        assert datatypes.Tree([ h - 1 for h in heads[1:] ]).isProjective()
+        weight = sum(weights[h][d] for d, h in enumerate(heads) if d > 0)
+        assert np.isclose(weight, best_projective_weight(weights))
+
+
+class FakeInstance(object):
+    def __init__(self, length):
+        self.sentence = [ None ] * length
+
+
+def test_scores_buffer_is_reused():
+    mst = arraycle.ArrayChuLiuEdmonds()
+    longScores = mst.emptyScores(FakeInstance(5))
+    longScores.addScore(2, 3, 1.0)
+
+    shortScores = mst.emptyScores(FakeInstance(3))
+    assert shortScores.scores.shape == (4, 4)
+    assert np.shares_memory(longScores.scores, shortScores.scores)
+    assert not shortScores.scores.any()
+
+
+def test_candidate_scores_restrict_the_tree():
+    rng = np.random.RandomState(3)
+    candidates = rng.rand(6, 6) < 0.4
+    candidates[0, 1:] = True
+
+    weights = rng.randn(6, 6)
+    for mst in [ cle.ChuLiuEdmonds(), arraycle.ArrayChuLiuEdmonds(), eisner.Eisner() ]:
+        scores = mst.emptyScores(FakeInstance(5), candidates)
+        scores.setCandidateScores(weights.T[candidates.T], order="F")
+        assert np.array_equal(np.isfinite(scores.scores), candidates)
+
+        heads = mst.findMSTHeads(scores)
+        assert all(candidates[h, d] for d, h in enumerate(heads) if d > 0)
+
+
+def test_benchmark_cross_check():
+    algorithms = { name : alg() for name, alg in benchmark.ALGORITHMS.items() }
+    rng = np.random.RandomState(5)
+    assert benchmark.crossCheck(algorithms, rng, maxBruteLength=4, repeats=1, lengths=(12,)) == [ ]
+
+
+def test_cle_on_candidate_arcs_equals_dense_decoding():
+    rng = np.random.RandomState(11)
+    mst, arrayMst = cle.ChuLiuEdmonds(), arraycle.ArrayChuLiuEdmonds()
+
+    for length in list(range(3, 25)) * 3:
+        weights = benchmark.prunedScores(rng, length)
+        candidates = np.isfinite(weights)
+        sparseHeads = mst.findMSTHeads(gdatatypes.SquareArrayScores(length, weights, candidates))
+        denseHeads = arrayMst.findMSTHeads(gdatatypes.SquareArrayScores(length, weights))
+        assert np.isclose(benchmark.treeWeight(weights, sparseHeads), benchmark.treeWeight(weights, denseHeads))
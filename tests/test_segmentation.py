@@ -0,0 +1,88 @@
+"Tests parsing overlong sentences in windows."
+
+import io
+
+import numpy as np
+
+from imsnpars.tools import datatypes, utils
+from imsnpars.nparser import segmentation
+
+
+class Collector(object):
+    def __init__(self):
+        self.trees = [ ]
+        self.metadata = [ ]
+
+    def processTree(self, sent, tree, metadata = None):
+        self.trees.append((sent, tree))
+        self.metadata.append(metadata)
+
+
+def tokens(length):
+    return [ utils.ConLLToken(i + 1, "w", "_", "X", "X", "_", None, None, None) for i in range(length) ]
+
+
+def test_windows_are_stitched_to_the_first_root():
+    collector = Collector()
+    writer = segmentation.SegmentingWriter(collector, 3)
+    sentences = [ tokens(7), tokens(2) ]
+
+    windowTrees = { 3 : datatypes.Tree([ 1, -1, 1 ], [ "x", "root", "y" ]),
+                    1 : datatypes.Tree([ -1 ], [ "root" ]),
+                    2 : datatypes.Tree([ -1, 0 ], [ "root", "z" ]) }
+    for window in writer.windows(sentences):
+        writer.processTree(window, windowTrees[len(window)])
+
+    assert [ sent for sent, _ in collector.trees ] == sentences
+    stitched = collector.trees[0][1]
+    assert stitched.toList() == [ 1, -1, 1, 4, 1, 4, 1 ]
+    assert stitched.getLabels() == [ "x", "root", "y", "x", segmentation.REATTACHED_LBL, "y", segmentation.REATTACHED_LBL ]
+    assert collector.trees[1][1].toList() == [ -1, 0 ]
+    assert collector.metadata == [ { "imsnpars_windows" : "3" }, None ]
+
+
+def test_stitched_tree_has_one_root_label():
+    trees = [ datatypes.Tree([ -1, 0, -1 ], [ "root", "obj", "root" ]),
+              datatypes.Tree([ 1, -1 ], [ "nsubj", "root" ]) ]
+    stitched = segmentation.stitchTrees(trees)
+
+    assert stitched.toList() == [ -1, 0, 0, 4, 0 ]
+    assert stitched.getLabels().count("root") == 1
+
+
+def test_split_sentences_are_marked_in_the_output():
+    out = io.StringIO()
+    writer = segmentation.SegmentingWriter(utils.LazySentenceWriter(out), 2)
+    sentences = [ tokens(3), tokens(1) ]
+    windowTrees = { 2 : datatypes.Tree([ -1, 0 ], [ "root", "obj" ]),
+                    1 : datatypes.Tree([ -1 ], [ "root" ]) }
+    for window in writer.windows(sentences):
+        writer.processTree(window, windowTrees[len(window)])
+
+    written = out.getvalue().split("\n\n")
+    assert written[0].startswith("# imsnpars_windows = 2\n")
+    assert not written[1].startswith("#")
+
+
+
+def test_windowed_prediction_with_gold_heads_outside_the_windows():
+    heads = [ 2, 0, 2, 5, 2, 5, 4 ]
+    sentence = [ utils.ConLLToken(i + 1, "w", "_", "X", "X", "_", head, "dep", None) for i, head in enumerate(heads) ]
+    collector = Collector()
+    writer = segmentation.SegmentingWriter(collector, 3)
+
+    windows = [ ]
+    for window in writer.windows([ sentence ]):
+        # gold heads are looked up in (head x dependent) matrices of the window, as when pruning
+        goldArcs = np.zeros((len(window) + 1, len(window) + 1), dtype=bool)
+        for dId, tok in enumerate(window):
+            if tok.headId != None:
+                goldArcs[tok.getHeadPos() + 1, dId + 1] = True
+
+        windows.append(window)
+        writer.processTree(window, datatypes.Tree([ -1 ] + [ 0 ] * (len(window) - 1)))
+
+    assert [ [ tok.tokId for tok in window ] for window in windows ] == [ [ 1, 2, 3 ], [ 1, 2, 3 ], [ 1 ] ]
+    assert [ [ tok.headId for tok in window ] for window in windows ] == [ [ 2, 0, 2 ], [ 2, None, 2 ], [ None ] ]
+    assert [ tok.headId for tok in sentence ] == heads
+    assert collector.trees[0][0] is sentence
@@ -0,0 +1,164 @@
+"Tests the transition systems on the array-backed parser state."
+
+import random
+
+from imsnpars.tools import datatypes
+from imsnpars.nparser.trans import features, labeler
+from imsnpars.nparser.trans.tsystem import arcstandard, archybrid, asswap, ahswap, oracle, tdatatypes
+
+
+def test_copied_state_is_independent():
+    system = asswap.ArcStandardWithSwap()
+    state = system.initialState(4)
+    for transId in [ system.SHIFT, system.SHIFT, system.SHIFT ]:
+        system.applyTransition(state, transId)
+
+    copied = state.copy()
+    system.applyTransition(copied, system.SWAP)
+    system.applyTransition(copied, system.LEFTARC)
+
+    assert state.stack.toList() == [ -1, 0, 1, 2 ]
+    assert state.buffer.toList() == [ 3 ]
+    assert state.arcs.getNrOfArcs() == 0
+    assert copied.stack.toList() == [ -1, 2 ]
+    assert copied.buffer.toList() == [ 1, 3 ]
+    assert copied.arcs.getHead(0) == 2
+
+
+def test_static_oracles_rebuild_the_tree():
+    projective = datatypes.Tree([ 1, -1, 3, 1, 1 ])
+    nonProjective = datatypes.Tree([ 2, 3, -1, 2, 1 ])
+
+    for system, oracleCls, tree in [ (arcstandard.ArcStandard(), arcstandard.ArcStandardStaticOracle, projective),
+                                     (archybrid.ArcHybrid(), archybrid.ArcHybridStaticOracle, projective),
+                                     (asswap.ArcStandardWithSwap(), asswap.ArcStandardWithSwapLazyOracle, nonProjective),
+                                     (ahswap.ArcHybridWithSwap(), ahswap.ArcHybridWithSwapStaticOracle, nonProjective) ]:
+        transitions = oracle.buildStaticCorrectTransitions(tree, system, oracleCls(system))
+        rebuilt = tdatatypes.buildTreeFromTransitions(system, tree.nrOfTokens(), transitions)
+        assert rebuilt.toList() == tree.toList()
+
+
+def test_second_children_are_tracked():
+    tree = tdatatypes.TreeUnderConstruction(6)
+    for dep in [ 3, 0, 5, 1, 4 ]:
+        tree.add(2, dep)
+
+    assert tree.howManyChildren(2) == 5
+    assert (tree.getLeftChild(2), tree.getLeftChild(2, 1)) == (0, 1)
+    assert (tree.getRightChild(2), tree.getRightChild(2, 1)) == (5, 4)
+    assert tree.getLeftChild(3) is None
+
+
+def test_compiled_features_match_single_extractors():
+    system = archybrid.ArcHybrid()
+    state = system.initialState(5)
+    for transId in [ system.SHIFT, system.SHIFT, system.LEFTARC, system.SHIFT, system.SHIFT, system.RIGHTARC ]:
+        system.applyTransition(state, transId)
+
+    single = [ features.StateFeatExtractor(featId) for featId in features.FeatId ]
+    expected = [ feat.extractFeatures(state) for feat in single ]
+    positions = features.TransFeatureExtractor(single).extractAllPositions(state)
+
+    assert list(positions) == [ features.CompiledFeatExtractor.NONE if pos is None else pos for pos in expected ]
+
+
+def test_labeled_valid_mask_follows_the_system():
+    system = archybrid.ArcHybrid()
+    transLabeler = labeler.TransSystemLabeler(system)
+    transLabeler._storeLabels([ "nsubj", "obj" ])
+
+    state = transLabeler.initialState(3)
+    assert list(system.validMask(state)) == [ True, False, False ]
+    assert list(transLabeler.validMask(state)) == [ transLabeler.getSysTrans(tId) == system.SHIFT for tId in range(transLabeler.getNrOfTransitions()) ]
+
+    transLabeler.applyTransition(state, transLabeler.getLblTrans(system.SHIFT))
+    assert list(transLabeler.validMask(state)) == [ transLabeler.isValidTransition(state, tId) for tId in range(transLabeler.getNrOfTransitions()) ]
+
+
+def test_labeled_transitions_are_indexed_by_system_transition_and_label():
+    system = asswap.ArcStandardWithSwap()
+    transLabeler = labeler.TransSystemLabeler(system)
+    transLabeler._storeLabels([ "nsubj", "obj", "root" ])
+
+    assert transLabeler.getNrOfSysTransitions() == system.getNrOfTransitions()
+    assert transLabeler.getNrOfLabels() == 3
+
+    for tId in range(transLabeler.getNrOfTransitions()):
+        sysTrans = transLabeler.getSysTrans(tId)
+        lblId = transLabeler.getLblId(tId)
+        assert transLabeler.isArcTransition(sysTrans) == (lblId != None)
+        assert transLabeler.getLblTransById(sysTrans, lblId) == tId
+
+
+def test_gold_transitions_are_reloaded_for_other_label_ids(tmp_path):
+    tree = datatypes.Tree([ 1, -1, 3, 1, 1 ], [ "det", "root", "amod", "obj", "punct" ])
+    cacheFile = str(tmp_path / "gold.transitions")
+
+    def buildCache(labels):
+        system = archybrid.ArcHybrid()
+        transLabeler = labeler.TransSystemLabeler(system)
+        transLabeler._storeLabels(labels)
+        return transLabeler, archybrid.ArcHybridStaticOracle(system, transLabeler)
+
+    transLabeler, anoracle = buildCache([ "det", "root", "amod", "obj", "punct" ])
+    oracle.GoldTransitionCache(transLabeler, anoracle).readData([ tree ], cacheFile)
+
+    transLabeler, anoracle = buildCache([ "punct", "obj", "amod", "root", "det" ])
+    cache = oracle.GoldTransitionCache(transLabeler, anoracle)
+    cache.readData([ ], cacheFile)
+    assert list(cache.getTransitions(tree)) == oracle.buildStaticCorrectTransitions(tree, transLabeler, anoracle)
+
+
+def scanningZeroCostTransitions(system, state, tree):
+    """The dynamic oracle costs computed by scanning the stack and the buffer"""
+    inf = float("inf")
+    s0 = state.stack.top() if not state.stack.empty() else None
+    stack, buff = state.stack.toList(), state.buffer.toList()
+
+    if state.stack.empty() or state.buffer.empty() or s0 == tdatatypes.State.ROOT:
+        leftCost = inf
+    else:
+        leftCost = sum(1 for d in buff if tree.hasArc(s0, d)) + sum(1 for h in buff[1:] if tree.hasArc(h, s0))
+        leftCost += 1 if len(stack) > 1 and tree.hasArc(stack[-2], s0) else 0
+
+    if len(stack) < 2 or s0 == tdatatypes.State.ROOT:
+        rightCost = inf
+    else:
+        rightCost = sum(1 for d in buff if tree.hasArc(s0, d)) + sum(1 for h in buff if tree.hasArc(h, s0))
+
+    if state.buffer.empty():
+        shiftCost = inf
+    else:
+        shiftCost = sum(1 for d in stack if tree.hasArc(buff[0], d)) + sum(1 for h in stack[:-1] if tree.hasArc(h, buff[0]))
+
+    costs = [ (system.LEFTARC, leftCost), (system.RIGHTARC, rightCost), (system.SHIFT, shiftCost) ]
+    return [ transId for transId, cost in costs if cost == 0 ]
+
+
+def test_incremental_dynamic_oracle_matches_scanning_costs():
+    rng = random.Random(7)
+    system = archybrid.ArcHybrid()
+    dynOracle = archybrid.ArcHybridDynamicOracle(system, None, oracle.OriginalExplorePolicy(1, 0.9))
+
+    for _ in range(200):
+        nrOfTokens = rng.randint(1, 12)
+        order = rng.sample(range(nrOfTokens), nrOfTokens)
+        heads = [ -1 ] * nrOfTokens
+        for pos, tokId in enumerate(order[1:], 1):
+            heads[tokId] = order[rng.randrange(pos)]
+
+        tree = datatypes.Tree(heads)
+        if not tree.isProjective():
+            continue
+
+        state = system.initialState(nrOfTokens)
+        while not system.isFinal(state):
+            assert dynOracle.nextCorrectTransitions(state, tree) == scanningZeroCostTransitions(system, state, tree)
+
+            # explore: the branched state resets the counters, the original one is followed again afterwards
+            if rng.random() < 0.2:
+                branched = state.copy()
+                system.applyTransition(branched, rng.choice([ tId for tId in range(3) if system.isValidTransition(branched, tId) ]))
+                assert dynOracle.nextCorrectTransitions(branched, tree) == scanningZeroCostTransitions(system, branched, tree)
+
+            system.applyTransition(state, rng.choice([ tId for tId in range(3) if system.isValidTransition(state, tId) ]))